@@ -3,15 +3,22 @@ Main script file for pysperf.
 
 This file contains the argument parser to interpret command line arguments to pysperf.
 """
+import sys
 from argparse import ArgumentParser
 from pathlib import Path
 
-from .analysis import collect_run_info, export_to_excel
+from .analysis import (
+    collect_run_info, create_performance_profiles, create_shifted_geometric_mean_tables, export_results_table,
+    export_to_excel,
+    report_subsolver_times, report_timing_variability, time_metrics, )
+from .comparison import report_run_comparison
 from .config import options, runsdir
 from .model_library import list_model_stats
 from .paver_utils.convert_to_paver import create_paver_tracefile, create_solu_file
+from .racing import register_portfolio_solver
 from .run_manager import setup_new_matrix_run, setup_redo_matrix_run
 from .solver_library_tools import list_solver_capabilities
+from .tuning import execute_tuning_run, tuning_methods
 
 
 def _build_list_subparser(list_parser: ArgumentParser):
@@ -53,10 +60,16 @@ def _build_run_subparser(run_parser: ArgumentParser):
     # Run number
     run_parser.add_argument('-r', help="Specify a run number.", type=int)
     run_parser.add_argument('--time-limit', help="Override the config file time limit (seconds).", type=float)
+    run_parser.add_argument('--repeats', help="Override the config file number of attempts per job.", type=int)
+    run_parser.add_argument('--permute-model-order', action='store_true',
+                            help="Permute the constraint order of the model in repeated attempts.")
+    run_parser.add_argument('--preprocessing', action='store', nargs='*',
+                            help="Override the config file preprocessing steps (none if given without steps).")
     # Run engine
     run_parser.add_argument(
-        '--run-with', choices=['serial', 'torque', 'setup-only'],
-        help="Specify an execution engine.", default='torque')
+        '--run-with', choices=['serial', 'torque', 'setup-only', 'adaptive'],
+        help="Specify an execution engine. Adaptive runs drop dominated solvers by statistical racing.",
+        default='torque')
     # Filtering which models and solvers to execute
     run_parser.add_argument('--models', action='store', nargs='+', help="Run only specified models.")
     run_parser.add_argument('--solvers', action='store', nargs='+', help="Run only specified solvers.")
@@ -70,6 +83,12 @@ def _run(args):
     print(args)  # For debugging
     if args.time_limit:
         options.time_limit = args.time_limit
+    if args.repeats:
+        options.repeats = args.repeats
+    if args.permute_model_order:
+        options["permute model order"] = True
+    if args.preprocessing is not None:
+        options.preprocessing = args.preprocessing
     run_number = args.r
 
     valid_models = args.models if args.models else set()
@@ -86,25 +105,129 @@ def _run(args):
             model_set=valid_models, solver_set=valid_solvers, model_type_set=valid_model_types)
 
     # Do the actual run
-    if args.run_with == "torque":
+    _execute_run(args.run_with)
+
+
+def _execute_run(run_with: str):
+    if run_with == "torque":
         from .torque_run_manager import execute_run
         execute_run()
-    elif args.run_with == "serial":
+    elif run_with == "serial":
         from .serial_run_manager import execute_run
         execute_run()
+    elif run_with == "adaptive":
+        from .statistical_racing import execute_adaptive_run
+        execute_adaptive_run()
     else:
         pass
 
 
+def _build_race_subparser(race_parser: ArgumentParser):
+    race_parser.set_defaults(call_function=_race)
+    race_parser.add_argument('--solvers', action='store', nargs='+', required=True,
+                             help="Solvers to race against each other on each model.")
+    race_parser.add_argument('--time-limit', help="Override the config file time limit (seconds).", type=float)
+    race_parser.add_argument(
+        '--run-with', choices=['serial', 'torque', 'setup-only'],
+        help="Specify an execution engine.", default='torque')
+    race_parser.add_argument('--models', action='store', nargs='+', help="Race only on specified models.")
+    race_parser.add_argument('--model-types', action='store', nargs='+', help="Race only on specified model types.")
+
+
+def _race(args):
+    print(args)  # For debugging
+    if args.time_limit:
+        options.time_limit = args.time_limit
+    from .solver_library import solvers  # Registers the library solvers
+    portfolio_solver_name = register_portfolio_solver(args.solvers)
+    print(f"Racing {', '.join(solvers[portfolio_solver_name].racers)} as {portfolio_solver_name}.")
+    setup_new_matrix_run(
+        model_set=args.models if args.models else set(), solver_set={portfolio_solver_name},
+        model_type_set=args.model_types if args.model_types else set())
+    _execute_run(args.run_with)
+
+
+def _build_tune_subparser(tune_parser: ArgumentParser):
+    tune_parser.set_defaults(call_function=_tune)
+    tune_parser.add_argument('--solvers', action='store', nargs='+', required=True,
+                             help="Solvers whose parameter grid variants are tuned.")
+    tune_parser.add_argument('--method', choices=tuning_methods,
+                             help="Override the config file tuning method.")
+    tune_parser.add_argument('--budget', help="Override the config file tuning budget (CPU hours).", type=float)
+    tune_parser.add_argument('--time-limit', help="Override the config file time limit (seconds).", type=float)
+    tune_parser.add_argument('--models', action='store', nargs='+', help="Tune only on specified models.")
+    tune_parser.add_argument('--model-types', action='store', nargs='+', help="Tune only on specified model types.")
+
+
+def _tune(args):
+    print(args)  # For debugging
+    if args.time_limit:
+        options.time_limit = args.time_limit
+    execute_tuning_run(
+        args.solvers,
+        model_set=args.models if args.models else set(),
+        model_type_set=args.model_types if args.model_types else set(),
+        method=args.method if args.method else options["tuning method"],
+        cpu_hours=args.budget if args.budget else options["tuning budget"])
+
+
 def _build_analyze_subparser(analyze_parser: ArgumentParser):
     analyze_parser.set_defaults(call_function=_analyze)
     analyze_parser.add_argument('-r', help="Specify a run number.", type=int)
+    analyze_parser.add_argument('--profiles', action='store_true',
+                                help="Create performance profiles and cactus plots.")
+    analyze_parser.add_argument('--sgm', action='store_true',
+                                help="Compute shifted geometric mean times with bootstrap confidence intervals.")
+    analyze_parser.add_argument('--variability', action='store_true',
+                                help="Report the solver time variability of repeated jobs.")
+    analyze_parser.add_argument('--subsolvers', action='store_true',
+                                help="Report the subsolver time decomposition of GDPopt and MindtPy jobs.")
 
 
 def _analyze(args):
     print(args)  # For debugging
     run_number = args.r
     collect_run_info(run_number)
+    if args.profiles:
+        create_performance_profiles(run_number)
+    if args.sgm:
+        create_shifted_geometric_mean_tables(run_number)
+    if args.variability:
+        report_timing_variability(run_number)
+    if args.subsolvers:
+        report_subsolver_times(run_number)
+
+
+def _build_compare_subparser(compare_parser: ArgumentParser):
+    compare_parser.set_defaults(call_function=_compare)
+    compare_parser.add_argument('-r', '--runs', action='append', type=int, required=True,
+                                help="Specify the base run number, then the new run number: -r BASE -r NEW.")
+    compare_parser.add_argument('--metric', default="time_to_soln", choices=time_metrics,
+                                help="Time metric to compare.")
+
+
+def _compare(args):
+    print(args)  # For debugging
+    if len(args.runs) != 2:
+        raise ValueError(f"Expected a base and a new run number, but got {args.runs}.")
+    base_run, new_run = args.runs
+    sys.exit(report_run_comparison(base_run, new_run, args.metric))
+
+
+def _build_bench_subparser(bench_parser: ArgumentParser):
+    bench_parser.set_defaults(call_function=_bench)
+    bench_parser.add_argument('--jobs', type=int, default=1000, help="Number of jobs of the synthetic runs.")
+    bench_parser.add_argument('--repeats', type=int, default=3, help="Repeats of each benchmark (median reported).")
+    bench_parser.add_argument('--save-baseline', action='store_true',
+                              help="Save the timings as the baseline, instead of comparing to it.")
+    bench_parser.add_argument('--baseline', help="Baseline file (default: the baseline of this host).")
+
+
+def _bench(args):
+    print(args)  # For debugging
+    # Imported here, so that other commands do not load the benchmark suite with its mock solvers and models
+    from .benchmarks.suite import run_benchmark_suite
+    sys.exit(run_benchmark_suite(args.jobs, args.repeats, args.save_baseline, args.baseline))
 
 
 def _build_export_subparser(export_parser: ArgumentParser):
@@ -112,6 +235,9 @@ def _build_export_subparser(export_parser: ArgumentParser):
     export_parser.add_argument('--make-solu-file', action='store_true', help="Make a Paver *.solu file.")
     export_parser.add_argument('--make-trace-file', action='store_true', help="Make a Paver *.trc file.")
     export_parser.add_argument('--to-excel', action='store_true', help="Export results to excel.")
+    export_parser.add_argument('--to-parquet', action='store_true', help="Export the results table to parquet.")
+    export_parser.add_argument('--to-csv', action='store_true', help="Export the results table to csv.")
+    export_parser.add_argument('--to-feather', action='store_true', help="Export the results table to feather.")
     export_parser.add_argument('-r', '--runs', nargs="+", help="Specify one or more run numbers.", type=int)
 
 
@@ -121,10 +247,12 @@ def _export(args):
     if args.make_solu_file:
         create_solu_file()
     if args.make_trace_file:
-        assert len(run_numbers) == 1
-        create_paver_tracefile(run_numbers[0])
+        create_paver_tracefile(run_numbers)
     if args.to_excel:
         export_to_excel(run_numbers)
+    for file_format in ("parquet", "csv", "feather"):
+        if getattr(args, f"to_{file_format}"):
+            export_results_table(run_numbers, file_format)
 
 
 def _update_self(args):
@@ -150,14 +278,30 @@ def main():
         'run',
         description='Perform a benchmarking run.',
         help="Setup and execute a benchmarking run.")
+    race_parser = subparsers.add_parser(
+        'race',
+        description='Race a portfolio of solvers in parallel on each model.',
+        help="Setup and execute a run of a parallel solver portfolio.")
+    tune_parser = subparsers.add_parser(
+        'tune',
+        description='Tune solver parameters within a CPU time budget.',
+        help="Setup and execute a budgeted run of solver parameter variants.")
     analyze_parser = subparsers.add_parser(
         'analyze',
         description="Analyze run results.",
         help="Analyze results from a benchmarking run.")
+    compare_parser = subparsers.add_parser(
+        'compare',
+        description="Compare the results of two runs.",
+        help="Detect changes in performance between two benchmarking runs.")
     export_parser = subparsers.add_parser(
         'export',
         description='Export data or results from pysperf.',
         help="Export analysis results to Excel or Paver.")
+    bench_parser = subparsers.add_parser(
+        'bench',
+        description="Benchmark the overhead of the pysperf harness itself.",
+        help="Time the harness on synthetic runs and detect regressions from a baseline.")
     update_parser = subparsers.add_parser(
         'update',
         description='Update pysperf source. [WARNING: Developer tool only].',
@@ -166,8 +310,12 @@ def main():
     # Build the subparsers
     _build_list_subparser(list_parser)
     _build_run_subparser(run_parser)
+    _build_race_subparser(race_parser)
+    _build_tune_subparser(tune_parser)
     _build_analyze_subparser(analyze_parser)
+    _build_compare_subparser(compare_parser)
     _build_export_subparser(export_parser)
+    _build_bench_subparser(bench_parser)
     update_parser.set_defaults(call_function=_update_self)
 
     # Parse the arguments and call the correct function.
@@ -1,22 +1,48 @@
+import json
+import os
+import warnings
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Iterable, List, Optional, Tuple
 
+import numpy
 import openpyxl
 import pandas
 import yaml
 from pyomo.environ import SolverStatus, TerminationCondition as pyomo_tc
-from pyutilib.misc import Container
 
-from pysperf.base_classes import _JobResult
-from pysperf.model_library import models
+try:
+    from yaml import CSafeLoader as _YamlSafeLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlSafeLoader
+
+try:
+    from matplotlib.figure import Figure
+    _matplotlib_available = True
+except ImportError:
+    Figure = None
+    _matplotlib_available = False
+
+try:
+    import pyarrow
+    _parquet_available = True
+except ImportError:
+    pyarrow = None
+    _parquet_available = False
+
+from pysperf.base_classes import _JobResult, InfeasibleExpected
+from pysperf.model_library import models, requires_model_stats
 from pysperf.solver_library import solvers
-from .base_classes import _TestModel, _TestSolver
+from .calibration import get_reference_calibration_time
 from .config import (
     cache_internal_options_to_file, job_model_built_filename, job_result_filename, job_solve_done_filename,
     job_start_filename,
-    job_stop_filename, options, outputdir, )
+    job_stop_filename, options, outputdir, _profiles_dir, results_index_filename, results_table_filename,
+    time_format, )
+from .preprocessing import preprocessing_size_columns
 from .run_manager import _load_run_config, _write_run_config, get_run_dir, this_run_config
+from .subsolver_timing import subproblem_categories
 
 
 def analyze_runs(run_numbers: Iterable[int] = ()):
@@ -47,11 +73,19 @@ def collect_run_info(run_number: Optional[int] = None):
             finished.add(job)
 
     # Total jobs executed
+    jobs_pruned = this_run_config.get('jobs_pruned', set()) - started
+    jobs_not_executed = [job for job in this_run_config.jobs if job not in started and job not in jobs_pruned]
     print(f"{len(started)} of {len(this_run_config.jobs)} jobs executed. "
-          f"{len(this_run_config.jobs) - len(started)} jobs never executed:")
-    for model_name, solver_name in this_run_config.jobs:
-        if (model_name, solver_name) not in started:
-            print(f" - {model_name} {solver_name}")
+          f"{len(jobs_not_executed)} jobs never executed:")
+    for model_name, solver_name in jobs_not_executed:
+        print(f" - {model_name} {solver_name}")
+    # Jobs of solvers dropped by statistical racing are not failures
+    pruned_solvers = defaultdict(list)
+    for model_name, solver_name in jobs_pruned:
+        pruned_solvers[solver_name].append(model_name)
+    print(f"{len(jobs_pruned)} jobs were pruned by racing or tuning:")
+    for solver_name, pruned_list in sorted(pruned_solvers.items()):
+        print(f" - {solver_name} ({len(pruned_list)} pruned)")
 
     # Model build failures
     jobs_with_failed_model_builds = started - model_built
@@ -77,6 +111,19 @@ def collect_run_info(run_number: Optional[int] = None):
     for model_name, solver_name in started - finished:
         print(f" - {solver_name} {model_name}")
 
+    # Jobs stopped by kernel resource limits
+    resource_limited = defaultdict(list)
+    for model_name, solver_name in finished - solver_done:
+        if not this_run_dir.joinpath(solver_name, model_name, job_result_filename).exists():
+            continue
+        job_result = _get_job_result(this_run_dir, model_name, solver_name)
+        if 'resource_limit' in job_result:
+            resource_limited[job_result.resource_limit].append(f"{solver_name} {model_name}")
+    for resource_limit, limited_jobs in resource_limited.items():
+        print(f"{len(limited_jobs)} jobs hit the {resource_limit}:")
+        for job_name in sorted(limited_jobs):
+            print(f" - {job_name}")
+
     # Write sets to files
     this_run_config.jobs_failed = finished - solver_done
     # TODO jobs_failed should be augmented with solvers with bad termination conditions
@@ -87,8 +134,7 @@ def collect_run_info(run_number: Optional[int] = None):
 
 
 def _get_job_result(run_dir: Path, model: str, solver: str):
-    with run_dir.joinpath(solver, model, job_result_filename).open('r') as result_file:
-        _stored_result = yaml.safe_load(result_file)
+    _stored_result = _read_job_result_file(run_dir, model, solver)
     if not _stored_result:
         return _JobResult()
     job_result = _JobResult(**_stored_result)
@@ -102,120 +148,593 @@ def _get_job_result(run_dir: Path, model: str, solver: str):
     return job_result
 
 
+_excel_columns = [
+    "time", "model", "solver", "host", "LB", "UB", "elapsed", "norm_elapsed", "iterations", "threads",
+    "tc", "sense", "soln_gap", "time_to_ok_soln",
+    "time_to_soln", "opt_gap", "time_to_opt", "err_msg"]
+_excel_summary_columns = [
+    "run", "solver", "jobs", "solved", "ok_solved", "opt_solved", "median_elapsed"]
+
+
 def export_to_excel(run_numbers: Iterable[int]) -> None:
-    excel_columns = [
-        "time", "model", "solver", "LB", "UB", "elapsed", "iterations",
-        "tc", "sense", "soln_gap", "time_to_ok_soln",
-        "time_to_soln", "opt_gap", "time_to_opt", "err_msg"]
-    rows = []
+    """
+    Exports the results of the runs to an Excel workbook, with one sheet per run and a summary sheet.
+
+    The workbook is streamed to file in write-only mode, one run at a time, so that memory use is bounded
+    by the largest run rather than by the whole export.
+    """
+    workbook = openpyxl.Workbook(write_only=True)
+    summary_sheet = workbook.create_sheet("summary")
+    summaries = []
     for run_number in run_numbers:
-        rows.extend(_collect_run_rows(run_number))
+        table = _collect_run_table(run_number)
+        _write_excel_sheet(workbook.create_sheet(f"run{run_number}"), table[_excel_columns])
+        summaries.append(_summarize_run(table))
+    summary = pandas.concat(summaries, ignore_index=True) if summaries else pandas.DataFrame(
+        columns=_excel_summary_columns)
+    _write_excel_sheet(summary_sheet, summary)
+    workbook.save(str(outputdir.joinpath("results.xlsx")))
+
 
-    # Use Pandas to export to excel
-    df = pandas.DataFrame.from_records(
-        rows, columns=excel_columns
-    ).replace(  # replace infinity with empty cells
-        [float('inf'), float('-inf')], [None, None])
-    with pandas.ExcelWriter(str(outputdir.joinpath("results.xlsx"))) as writer:
-        df.to_excel(writer, sheet_name="data")
-    _autoformat_excel()
+def _summarize_run(table: pandas.DataFrame) -> pandas.DataFrame:
+    """Returns the number of jobs, the number solved for each time metric, and the median time of each solver."""
+    grouped = table.groupby("solver", sort=True)
+    summary = pandas.DataFrame({
+        "jobs": grouped.size(),
+        "solved": grouped["time_to_soln"].agg(lambda times: numpy.isfinite(times).sum()),
+        "ok_solved": grouped["time_to_ok_soln"].agg(lambda times: numpy.isfinite(times).sum()),
+        "opt_solved": grouped["time_to_opt"].agg(lambda times: numpy.isfinite(times).sum()),
+        "median_elapsed": grouped["elapsed"].median(),
+    }).reset_index()
+    summary.insert(0, "run", table["run"].iloc[0] if not table.empty else None)
+    return summary[_excel_summary_columns]
 
 
-def _collect_run_rows(run_number: int) -> List[Container]:
+def _write_excel_sheet(worksheet, df: pandas.DataFrame) -> None:
+    """Streams a DataFrame to a write-only worksheet, with the column widths computed from the data."""
+    # Replace infinity and missing values with empty cells
+    cells = df.astype(object).where(df.notna() & ~df.isin([numpy.inf, -numpy.inf]), None)
+    # Column widths must be set before the first row is written
+    for column_num, column in enumerate(cells.columns, start=1):
+        max_length = max(len(str(column)), cells[column].astype(str).str.len().max() if len(cells) else 0)
+        column_letter = openpyxl.utils.get_column_letter(column_num)
+        worksheet.column_dimensions[column_letter].width = (max_length + 2) * 1.05
+    worksheet.freeze_panes = 'A2'
+    worksheet.append(list(cells.columns))
+    for row in cells.itertuples(index=False, name=None):
+        worksheet.append(row)
+
+
+_categorical_columns = [
+    "model", "solver", "host", "tc", "solver_status", "sense", "model_type", "race_winner", "bigm_source",
+    "solver_time_source"]
+_results_file_formats = ["parquet", "csv", "feather"]
+
+
+def get_typed_results_table(run_numbers: Iterable[int]) -> pandas.DataFrame:
+    """
+    Returns the results tables of the runs as a single table with typed columns: job start times as datetimes,
+    and model, solver, and status columns as categoricals. Infinite times (not reached) are preserved.
+    """
+    table = pandas.concat([_collect_run_table(run_number) for run_number in run_numbers], ignore_index=True)
+    table["time"] = pandas.to_datetime(table["time"], format=time_format)
+    for column in _categorical_columns:
+        table[column] = table[column].astype("category")
+    return table
+
+
+def export_results_table(run_numbers: Iterable[int], file_format: str) -> None:
+    """Exports the typed results table of the runs to a parquet, csv, or feather file in the output directory."""
+    if file_format not in _results_file_formats:
+        raise ValueError(f"Unknown results file format '{file_format}'. Expected one of {_results_file_formats}.")
+    if file_format in {"parquet", "feather"} and not _parquet_available:
+        raise RuntimeError(f"Exporting results to {file_format} requires pyarrow, which is not installed.")
+    table = get_typed_results_table(run_numbers)
+    results_path = outputdir.joinpath(f"results.{file_format}")
+    if file_format == "parquet":
+        table.to_parquet(results_path, index=False)
+    elif file_format == "csv":
+        table.to_csv(results_path, index=False)
+    else:
+        table.to_feather(results_path)
+    print(f"Exported {len(table)} results to '{results_path}'.")
+
+
+@requires_model_stats
+def _collect_run_table(run_number: int) -> pandas.DataFrame:
+    """
+    Builds the columnar results table of a run, with one row per successfully completed job.
+
+    Model and solver information is joined into the table, and the gaps and times to solution/optimality
+    are computed as array operations over the whole run. The table is stored in the run directory.
+    """
     this_run_dir = get_run_dir(run_number)
     _load_run_config(this_run_dir)
-    rows = []
     # Process successfully complete jobs
-    for job in this_run_config.jobs_run - this_run_config.jobs_failed:
-        model_name, solver_name = job
-        test_model = models[model_name]
-        test_solver = solvers[solver_name]
-        job_data = Container()
-        job_data.model = model_name
-        job_data.solver = solver_name
-        test_result = _get_job_result(this_run_dir, model_name, solver_name)
-        if not test_result:
-            continue  # TODO This should be unnecessary. We should detect a failure earlier in analysis.
-        job_data.time = test_result.model_build_start_time
-        job_data.LB = test_result.LB
-        job_data.UB = test_result.UB
-        job_data.elapsed = test_result.solver_run_time
-        job_data.iterations = test_result.get('iterations', None)
-        job_data.tc = test_result.termination_condition
-        job_data.sense = test_model.objective_sense
-        if job_data.tc != 'infeasible':
-            job_data.soln_gap, job_data.opt_gap = _calculate_gaps(
-                test_model, test_solver, test_result.LB, test_result.UB)
-        else:
-            job_data.soln_gap, job_data.opt_gap = None, None
-
-        # Times to solution/optimality
-        if job_data.soln_gap is not None and job_data.soln_gap <= options.optcr + options['optcr tolerance']:
-            job_data.time_to_soln = test_result.solver_run_time
-            job_data.time_to_ok_soln = test_result.solver_run_time
-        elif job_data.soln_gap is not None and job_data.soln_gap <= options["ok solution tolerance"]:
-            job_data.time_to_soln = float('inf')
-            job_data.time_to_ok_soln = test_result.solver_run_time
-        else:
-            job_data.time_to_soln = float('inf')
-            job_data.time_to_ok_soln = float('inf')
+    records = _ingest_run_results(this_run_dir, sorted(this_run_config.jobs_run - this_run_config.jobs_failed))
+    # TODO Empty results should be unnecessary. We should detect a failure earlier in analysis.
+    records = [record for record in records if record is not None]
+    table = pandas.DataFrame.from_records(records, columns=_result_record_columns)
+    table.insert(0, "run", run_number)
+    table["time_limit"] = table["time_limit"].fillna(this_run_config.time_limit)
+    table = _join_library_info(table)
+    _calculate_gaps(table)
+    _calculate_times_to_solution(table)
+    _calculate_throughput(table)
+    _store_results_table(table, this_run_dir)
+    return table
+
+
+# Job result fields recorded in the results table unchanged, under the same name
+_stored_result_columns = [
+    "nodes", "gams_solver_status", "gams_model_status", "gams_resource_usage", "race_winner", "solver_time_source",
+    "bigm_source", "tight_bigm_constraints", "preprocessing_time", "preprocessing_cached", *preprocessing_size_columns,
+    "subsolver_solves", "subsolver_lp_time", "subsolver_mip_time", "subsolver_nlp_time", "subsolver_minlp_time",
+    "subsolver_interface_time", "decomposition_overhead_time", "subsolver_classification_time"]
+_result_record_columns = [
+    "model", "solver", "time", "host", "calibration_time", "LB", "UB", "elapsed", "iterations", "threads",
+    "tc", "solver_status", "err_msg", "time_limit", "attempts", "elapsed_median", "elapsed_iqr", "elapsed_cv",
+    *_stored_result_columns]
+
+
+def _read_job_result_file(run_dir: Path, model: str, solver: str) -> dict:
+    with run_dir.joinpath(solver, model, job_result_filename).open('r') as result_file:
+        return yaml.load(result_file, Loader=_YamlSafeLoader)
+
+
+def _load_results_index(run_dir: Path) -> dict:
+    try:
+        with run_dir.joinpath(results_index_filename).open('r') as indexfile:
+            return json.load(indexfile)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _write_results_index(run_dir: Path, results_index: dict) -> None:
+    # Write to a temporary file first, so that an interrupted analysis never leaves a partial index.
+    index_path = run_dir.joinpath(results_index_filename)
+    tmp_index_path = index_path.with_name(f"{index_path.name}.{os.getpid()}.tmp")
+    with tmp_index_path.open('w') as indexfile:
+        json.dump(results_index, indexfile, default=str)
+    tmp_index_path.replace(index_path)
+
+
+def _ingest_job_result(run_dir: Path, model_name: str, solver_name: str, index_entry: Optional[dict]
+                       ) -> Tuple[dict, bool]:
+    """Returns the ingestion index entry of a job result, and whether the result file was parsed."""
+    result_file_stat = run_dir.joinpath(solver_name, model_name, job_result_filename).stat()
+    if (index_entry is not None
+            and index_entry['mtime_ns'] == result_file_stat.st_mtime_ns
+            and index_entry['size'] == result_file_stat.st_size
+            # Records indexed by an older version of the analysis are parsed again
+            and (index_entry['record'] is None or list(index_entry['record']) == _result_record_columns)):
+        return index_entry, False
+    stored_result = _read_job_result_file(run_dir, model_name, solver_name)
+    return {
+        'mtime_ns': result_file_stat.st_mtime_ns,
+        'size': result_file_stat.st_size,
+        'record': _get_result_record(model_name, solver_name, stored_result) if stored_result else None,
+    }, True
+
+
+def _ingest_run_results(run_dir: Path, jobs: List[Tuple[str, str]]) -> List[Optional[dict]]:
+    """
+    Returns the results table records of the given jobs (None for an empty result), in the same order.
+
+    Parsed records are kept in an ingestion index in the run directory, together with the modification time
+    and size of the result file they were parsed from. Only new or changed result files are parsed again.
+    The entries of other jobs are kept, unless their result file no longer exists.
+    Result files are checked and parsed by a pool of threads, as file system latency dominates on network drives.
+    """
+    results_index = _load_results_index(run_dir)
+    job_keys = [f"{solver_name}/{model_name}" for model_name, solver_name in jobs]
+    with ThreadPoolExecutor(max_workers=options.get("result ingestion threads", 1)) as executor:
+        ingested = list(executor.map(
+            lambda job, job_key: _ingest_job_result(run_dir, *job, results_index.get(job_key, None)),
+            jobs, job_keys))
+    ingested_keys = set(job_keys)
+    updated_index = {
+        **{job_key: index_entry for job_key, index_entry in results_index.items()
+           if job_key in ingested_keys or run_dir.joinpath(job_key, job_result_filename).exists()},
+        **{job_key: index_entry for job_key, (index_entry, _) in zip(job_keys, ingested)}}
+    num_parsed = sum(parsed for _, parsed in ingested)
+    if num_parsed or updated_index.keys() != results_index.keys():
+        _write_results_index(run_dir, updated_index)
+    print(f"Ingested {len(jobs)} job results from {run_dir.name}: "
+          f"{num_parsed} parsed, {len(jobs) - num_parsed} unchanged.")
+    return [index_entry['record'] for index_entry, _ in ingested]
+
+
+def _get_result_record(model_name: str, solver_name: str, stored_result: dict) -> dict:
+    """Extracts the results table fields from a stored job result."""
+    termination_condition = stored_result.get('termination_condition', None)
+    attempt_times = numpy.array([
+        attempt.get('solver_run_time', None) for attempt in stored_result.get('attempts', ())], dtype=float)
+    if len(attempt_times) > 1 and not numpy.isnan(attempt_times).any():
+        q1, median, q3 = (float(quantile) for quantile in numpy.percentile(attempt_times, [25, 50, 75]))
+        elapsed_iqr = q3 - q1
+        elapsed_cv = float(attempt_times.std(ddof=1) / attempt_times.mean()) if attempt_times.mean() else None
+    else:
+        median = stored_result.get('solver_run_time', None)
+        elapsed_iqr = elapsed_cv = None
+    return {
+        "model": model_name,
+        "solver": solver_name,
+        "time": stored_result.get('model_build_start_time', None),
+        "host": stored_result.get('hostname', None),
+        "calibration_time": stored_result.get('calibration_time', None),
+        "LB": stored_result.get('LB', None),
+        "UB": stored_result.get('UB', None),
+        "elapsed": stored_result.get('solver_run_time', None),
+        "iterations": stored_result.get('iterations', None),
+        "threads": stored_result.get('solver_threads', None),
+        "tc": termination_condition if termination_condition not in [None, "None"] else 'unknown',
+        "solver_status": stored_result.get('pyomo_solver_status', None),
+        "err_msg": None,
+        "time_limit": stored_result.get('time_limit', None),
+        "attempts": max(len(attempt_times), 1),
+        "elapsed_median": median,
+        "elapsed_iqr": elapsed_iqr,
+        "elapsed_cv": elapsed_cv,
+        **{column: stored_result.get(column, None) for column in _stored_result_columns},
+    }
 
-        if job_data.opt_gap is not None and job_data.opt_gap <= options.optcr + options['optcr tolerance']:
-            job_data.time_to_opt = test_result.solver_run_time
-        else:
-            job_data.time_to_opt = float('inf')
-
-        rows.append(job_data)
-    return rows
-
-
-def _autoformat_excel():
-    # autoformat Excel sheet
-    wb = openpyxl.load_workbook(outputdir.joinpath("results.xlsx").open('rb'))
-    worksheet = wb.active
-    for col in worksheet.columns:
-        max_length = 0
-        column = col[0].column_letter  # Get the column name
-        for cell in col:
-            if len(str(cell.value)) > max_length:
-                max_length = len(str(cell.value))
-        adjusted_width = (max_length + 2) * 1.05
-        worksheet.column_dimensions[column].width = adjusted_width
-    worksheet.freeze_panes = 'A2'
-    wb.save(outputdir.joinpath("results.xlsx").open('wb'))
 
+_model_info_columns = [
+    "model_type", "sense", "opt_value", "best_value", "infeasible_expected",
+    "variables", "binary_variables", "integer_variables", "constraints", "nonlinear_constraints",
+    "disjuncts", "disjunctions", "build_time", "nonzeros", "nonlinear_nonzeros"]
 
-def _calculate_gaps(test_model: _TestModel, test_solver: _TestSolver, lb: float, ub: float) -> Tuple[float, float]:
-    minimizing = test_model.objective_sense == "minimize"
-    if lb is None:
-        lb = float('-inf')
-    if ub is None:
-        ub = float('inf')
 
-    library_solution = test_model.get('opt_value', None)
-    global_opt_known = True
-    if library_solution is None:
-        library_solution = test_model.get('best_value')
-        global_opt_known = False
+def _join_library_info(table: pandas.DataFrame) -> pandas.DataFrame:
+    """Joins model information, and whether each solver is global for the model type, into the results table."""
+    model_info = pandas.DataFrame.from_records(
+        tuple({
+            "model": test_model.name,
+            "model_type": test_model.model_type.name if test_model.model_type is not None else None,
+            "sense": test_model.objective_sense,
+            "opt_value": test_model.opt_value if test_model.opt_value is not InfeasibleExpected else None,
+            "best_value": test_model.best_value,
+            "infeasible_expected": test_model.opt_value is InfeasibleExpected,
+            **{key: test_model.get(key, None) for key in _model_info_columns[5:]},
+        } for test_model in models.values()),
+        columns=["model"] + _model_info_columns)
+    table = table.merge(model_info, on="model", how="left")
+    solver_global_types = {
+        solver_name: {mtype.name for mtype in test_solver.global_for_model_types}
+        for solver_name, test_solver in solvers.items()}
+    table["solver_is_global"] = [
+        model_type in solver_global_types.get(solver_name, ())
+        for solver_name, model_type in zip(table["solver"], table["model_type"])]
+    return table
 
-    if test_model.model_type not in test_solver.global_for_model_types:
-        global_opt_known = False
 
-    # For maximization problems, reverse the sign so that I can write
-    # remaining code as if it were minimization.
-    solution_value = ub if minimizing else -lb
-    lower_bound_value = lb if minimizing else -ub
-    correct_solution = library_solution if minimizing else -library_solution
+def _calculate_gaps(table: pandas.DataFrame) -> None:
+    """Adds the solution gap and optimality gap columns to the results table."""
+    minimizing = (table["sense"] == "minimize").to_numpy()
+    lb = table["LB"].to_numpy(dtype=float, na_value=numpy.nan)
+    ub = table["UB"].to_numpy(dtype=float, na_value=numpy.nan)
+    lb = numpy.where(numpy.isnan(lb), -numpy.inf, lb)
+    ub = numpy.where(numpy.isnan(ub), numpy.inf, ub)
+
+    opt_value = table["opt_value"].to_numpy(dtype=float, na_value=numpy.nan)
+    best_value = table["best_value"].to_numpy(dtype=float, na_value=numpy.nan)
+    library_solution = numpy.where(numpy.isnan(opt_value), best_value, opt_value)
+    global_opt_known = ~numpy.isnan(opt_value) & table["solver_is_global"].to_numpy(dtype=bool)
+
+    # For maximization problems, reverse the sign so that the remaining code is written as if it were minimization.
+    solution_value = numpy.where(minimizing, ub, -lb)
+    lower_bound_value = numpy.where(minimizing, lb, -ub)
+    correct_solution = numpy.where(minimizing, library_solution, -library_solution)
 
     # If the lower bound is above the upper bound (e.g. due to no-good cuts), then set it to be equal.
-    lower_bound_value = solution_value if lower_bound_value > solution_value else lower_bound_value
+    lower_bound_value = numpy.minimum(lower_bound_value, solution_value)
 
-    soln_gap = abs((solution_value - correct_solution) / correct_solution)
-    if global_opt_known:
-        opt_gap = abs((solution_value - lower_bound_value) / correct_solution)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        soln_gap = numpy.abs((solution_value - correct_solution) / correct_solution)
         # Global solver can converge to incorrect value.
         # The optimality gap should not be less than the solution gap.
-        opt_gap = max(soln_gap, opt_gap)
+        opt_gap = numpy.fmax(soln_gap, numpy.abs((solution_value - lower_bound_value) / correct_solution))
+    opt_gap = numpy.where(global_opt_known, opt_gap, numpy.nan)
+
+    infeasible = (table["tc"] == "infeasible").to_numpy()
+    table["soln_gap"] = numpy.where(infeasible, numpy.nan, soln_gap)
+    table["opt_gap"] = numpy.where(infeasible, numpy.nan, opt_gap)
+
+
+def _calculate_times_to_solution(table: pandas.DataFrame) -> None:
+    """Adds the normalized time and the times to (ok) solution and optimality columns to the results table."""
+    elapsed = table["elapsed"].to_numpy(dtype=float, na_value=numpy.nan)
+    calibration_time = table["calibration_time"].to_numpy(dtype=float, na_value=numpy.nan)
+    reference_calibration_time = get_reference_calibration_time()
+    if reference_calibration_time is not None:
+        table["norm_elapsed"] = elapsed * reference_calibration_time / calibration_time
+    else:
+        table["norm_elapsed"] = numpy.nan
+    if options.get("normalize times to reference machine", False):
+        cannot_normalize = numpy.isnan(table["norm_elapsed"].to_numpy()) & ~numpy.isnan(elapsed)
+        if cannot_normalize.any():
+            first_job = table[cannot_normalize].iloc[0]
+            raise ValueError(f"Job {first_job.solver} {first_job.model} cannot be normalized "
+                             f"to the reference machine.")
+        solve_time = table["norm_elapsed"].to_numpy()
     else:
-        opt_gap = None
-    return soln_gap, opt_gap
+        solve_time = elapsed
+
+    optcr_with_tolerance = options.optcr + options['optcr tolerance']
+    soln_gap = table["soln_gap"].to_numpy()
+    opt_gap = table["opt_gap"].to_numpy()
+    # Note: comparisons with NaN (unknown gaps) evaluate to False
+    table["time_to_soln"] = numpy.where(soln_gap <= optcr_with_tolerance, solve_time, numpy.inf)
+    table["time_to_ok_soln"] = numpy.where(
+        (soln_gap <= optcr_with_tolerance) | (soln_gap <= options["ok solution tolerance"]), solve_time, numpy.inf)
+    table["time_to_opt"] = numpy.where(opt_gap <= optcr_with_tolerance, solve_time, numpy.inf)
+
+
+def _calculate_throughput(table: pandas.DataFrame) -> None:
+    """Adds the iterations and nodes per second of solver time columns to the results table."""
+    elapsed = table["elapsed"].to_numpy(dtype=float, na_value=numpy.nan)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        for count_column in ("iterations", "nodes"):
+            counts = table[count_column].to_numpy(dtype=float, na_value=numpy.nan)
+            table[f"{count_column}_per_second"] = numpy.where(elapsed > 0, counts / elapsed, numpy.nan)
+
+
+def _results_table_path(run_dir: Path) -> Path:
+    if _parquet_available:
+        return run_dir.joinpath(results_table_filename + ".parquet")
+    else:
+        return run_dir.joinpath(results_table_filename + ".pkl")
+
+
+def _store_results_table(table: pandas.DataFrame, run_dir: Path) -> None:
+    table_path = _results_table_path(run_dir)
+    if _parquet_available:
+        table.to_parquet(table_path)
+    else:
+        table.to_pickle(table_path)
+
+
+def load_results_table(run_number: Optional[int] = None) -> pandas.DataFrame:
+    """Loads the stored results table of a run, as last built by an export."""
+    table_path = _results_table_path(get_run_dir(run_number))
+    if _parquet_available:
+        return pandas.read_parquet(table_path)
+    else:
+        return pandas.read_pickle(table_path)
+
+
+time_metrics = ["time_to_soln", "time_to_ok_soln", "time_to_opt"]
+_time_metric_descriptions = {
+    "time_to_soln": "Time to best known solution",
+    "time_to_ok_soln": "Time to ok solution",
+    "time_to_opt": "Time to global optimality",
+}
+virtual_best_solver = "Virtual-Best"
+virtual_worst_solver = "Virtual-Worst"
+# Times are floored at this value (seconds) when computing performance ratios, so that the ratios stay finite.
+_min_profile_time = 1E-3
+
+
+def get_time_matrix(table: pandas.DataFrame, metric: str, with_virtual_solvers: bool = True) -> pandas.DataFrame:
+    """
+    Returns the times of a time metric as a model by solver matrix, taking the best time over repeated jobs.
+
+    Solvers that failed or did not reach the metric on a compatible model are assigned an infinite time,
+    and incompatible model/solver pairs are NaN. The virtual-best solver takes the best time of any solver on
+    each model; the virtual-worst solver takes the worst time, for models addressed by all solvers.
+    Portfolio solvers are left out of the virtual solvers, as they race the other solvers.
+    """
+    time_matrix = table.pivot_table(index="model", columns="solver", values=metric, aggfunc="min")
+    compatible = numpy.array([
+        [models[model_name].model_type in solvers[solver_name].compatible_model_types
+         for solver_name in time_matrix.columns]
+        for model_name in time_matrix.index], dtype=bool).reshape(time_matrix.shape)
+    time_matrix = time_matrix.where(~(compatible & time_matrix.isna()), numpy.inf)
+    library_solvers = [solver_name for solver_name in time_matrix.columns
+                       if not solvers[solver_name].get('racers', None)]
+    if with_virtual_solvers and library_solvers:
+        times = time_matrix[library_solvers].to_numpy()
+        time_matrix[virtual_best_solver] = numpy.nanmin(times, axis=1)
+        time_matrix[virtual_worst_solver] = times.max(axis=1)  # NaN unless all solvers are compatible
+    return time_matrix
+
+
+def compute_cactus_curves(time_matrix: pandas.DataFrame) -> pandas.DataFrame:
+    """
+    Returns the number of instances solved by each solver within each time at which any solver finishes
+    an instance (the empirical cumulative distribution, or cactus plot, of the solve times).
+    """
+    times = time_matrix.to_numpy()
+    finish_times = numpy.unique(times[numpy.isfinite(times)])
+    sorted_times = numpy.sort(times, axis=0)  # NaN and infinite times sort to the end
+    curves = {
+        solver_name: numpy.searchsorted(sorted_times[:, solver_num], finish_times, side='right')
+        for solver_num, solver_name in enumerate(time_matrix.columns)}
+    return pandas.DataFrame(curves, index=pandas.Index(finish_times, name="time"))
+
+
+def compute_performance_profiles(time_matrix: pandas.DataFrame) -> pandas.DataFrame:
+    """
+    Returns the Dolan-More performance profiles of the solvers: the fraction of models on which each solver
+    is within a factor tau of the best solver, for each ratio tau reached by a solver.
+    Incompatible model/solver pairs (NaN) count as not solved. Virtual solvers are not included.
+    """
+    time_matrix = time_matrix.drop(columns=[virtual_best_solver, virtual_worst_solver], errors='ignore')
+    times = time_matrix.to_numpy()
+    times = numpy.where(numpy.isnan(times), numpy.nan, numpy.fmax(times, _min_profile_time))
+    with numpy.errstate(invalid='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # Models without compatible solvers
+        ratios = times / numpy.nanmin(times, axis=1, keepdims=True)
+    taus = numpy.unique(ratios[numpy.isfinite(ratios)])
+    sorted_ratios = numpy.sort(ratios, axis=0)
+    num_models = len(time_matrix.index)
+    profiles = {
+        solver_name: numpy.searchsorted(sorted_ratios[:, solver_num], taus, side='right') / num_models
+        for solver_num, solver_name in enumerate(time_matrix.columns)}
+    return pandas.DataFrame(profiles, index=pandas.Index(taus, name="tau"))
+
+
+def _plot_curves(curves: pandas.DataFrame, title: str, xlabel: str, ylabel: str, plot_path: Path) -> None:
+    fig = Figure(dpi=300)
+    ax = fig.subplots()
+    for solver_name in curves.columns:
+        if solver_name == virtual_best_solver:
+            style = dict(color="#000000")
+        elif solver_name == virtual_worst_solver:
+            style = dict(color="#cccccc")
+        else:
+            style = dict()
+        ax.step(curves.index, curves[solver_name], where='post', label=solver_name, **style)
+    ax.set_xscale('log')
+    ax.set_ylim(bottom=0)
+    fig.suptitle(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.legend(bbox_to_anchor=(1.02, 1), loc="upper left", frameon=False)
+    fig.savefig(str(plot_path), bbox_inches='tight')
+
+
+def create_performance_profiles(run_number: Optional[int] = None) -> None:
+    """
+    Writes the cactus curves and performance profiles of a run for each time metric to the output directory,
+    as CSV files, and as plots if matplotlib is available.
+    """
+    table = _collect_run_table(run_number)
+    _profiles_dir.mkdir(exist_ok=True)
+    for metric in time_metrics:
+        time_matrix = get_time_matrix(table, metric)
+        # Order solvers by the number of instances solved
+        time_matrix = time_matrix[numpy.isfinite(time_matrix).sum().sort_values(ascending=False, kind='stable').index]
+        cactus_curves = compute_cactus_curves(time_matrix)
+        performance_profiles = compute_performance_profiles(time_matrix)
+        file_prefix = metric.replace('_', '-')
+        cactus_curves.to_csv(_profiles_dir.joinpath(f"{file_prefix}.cactus.csv"))
+        performance_profiles.to_csv(_profiles_dir.joinpath(f"{file_prefix}.profile.csv"))
+        if not _matplotlib_available:
+            continue
+        _plot_curves(cactus_curves, _time_metric_descriptions[metric], 'Time (seconds)', 'Instances solved',
+                     _profiles_dir.joinpath(f"{file_prefix}.cactus.png"))
+        _plot_curves(performance_profiles, _time_metric_descriptions[metric], 'Performance ratio',
+                     'Fraction of instances', _profiles_dir.joinpath(f"{file_prefix}.profile.png"))
+    print(f"Performance profiles written to '{_profiles_dir}'.")
+
+
+def compute_shifted_geometric_means(table: pandas.DataFrame, metric: str = "time_to_soln",
+                                    group_by: Optional[str] = "model_type") -> pandas.DataFrame:
+    """
+    Returns the shifted geometric mean times of each solver, per group of models, with bootstrap confidence intervals.
+
+    Unsolved instances are penalized with the time limit. Models not compatible with a solver are left out of
+    its mean. Models are resampled with replacement jointly for all solvers of a group, and the confidence
+    interval is the percentile interval of the resampled means.
+    The table may be filtered, and grouped by any column (e.g. a model statistic), before calling this function.
+
+    Parameters
+    ----------
+    table: results table, as built by the analysis
+    metric: time metric
+    group_by: column by which to group the models, or None to compute over all models
+    """
+    shift = options.get("shifted geometric mean shift", 10)
+    num_resamples = options.get("bootstrap resamples", 1000)
+    confidence = options.get("bootstrap confidence level", 0.95)
+    rng = numpy.random.default_rng(0)
+    groups = table.groupby(group_by, sort=True) if group_by is not None else [("all", table)]
+    summaries = []
+    for group_name, group_table in groups:
+        time_matrix = get_time_matrix(group_table, metric, with_virtual_solvers=False)
+        time_limits = group_table.groupby("model")["time_limit"].max().reindex(time_matrix.index).to_numpy()
+        times = time_matrix.to_numpy()
+        solved = numpy.isfinite(times)
+        # Penalize unsolved instances with the time limit. Incompatible model/solver pairs remain NaN.
+        times = numpy.where(numpy.isposinf(times), time_limits[:, None], times)
+        # numpy.minimum (unlike fmin) keeps the NaN, so that incompatible pairs are left out of the means.
+        log_times = numpy.log(numpy.minimum(times, time_limits[:, None]) + shift)
+        resampled_models = rng.integers(len(log_times), size=(num_resamples, len(log_times)))
+        with numpy.errstate(invalid='ignore'), warnings.catch_warnings():
+            warnings.simplefilter('ignore', category=RuntimeWarning)  # for solvers without compatible models
+            sgm = numpy.exp(numpy.nanmean(log_times, axis=0)) - shift
+            resampled_sgm = numpy.exp(numpy.nanmean(log_times[resampled_models], axis=1)) - shift
+            ci_low, ci_high = numpy.nanquantile(
+                resampled_sgm, [(1 - confidence) / 2, (1 + confidence) / 2], axis=0)
+        summaries.append(pandas.DataFrame({
+            "group": group_name,
+            "solver": time_matrix.columns,
+            "models": (~numpy.isnan(times)).sum(axis=0),
+            "solved": solved.sum(axis=0),
+            "sgm": sgm,
+            "ci_low": ci_low,
+            "ci_high": ci_high,
+        }))
+    summary = pandas.concat(summaries, ignore_index=True) if summaries else pandas.DataFrame(
+        columns=["group", "solver", "models", "solved", "sgm", "ci_low", "ci_high"])
+    return summary.sort_values(["group", "sgm"], kind='stable', ignore_index=True)
+
+
+def create_shifted_geometric_mean_tables(run_number: Optional[int] = None) -> None:
+    """Writes the shifted geometric mean times of a run per solver and model type for each time metric."""
+    table = _collect_run_table(run_number)
+    for metric in time_metrics:
+        summary = compute_shifted_geometric_means(table, metric)
+        summary_path = outputdir.joinpath(f"{metric.replace('_', '-')}.sgm.csv")
+        summary.to_csv(summary_path, index=False)
+        print(f"Shifted geometric mean {metric} by model type:")
+        with pandas.option_context(
+                'display.max_rows', None, 'display.max_columns', None, 'expand_frame_repr', False):
+            print(summary.to_string(index=False, float_format="{:.2f}".format))
+
+
+def report_timing_variability(run_number: Optional[int] = None) -> pandas.DataFrame:
+    """
+    Reports the median, interquartile range and coefficient of variation of the solver times of repeated jobs,
+    and flags the jobs with a coefficient of variation above the variability threshold option.
+    """
+    table = _collect_run_table(run_number)
+    variability = table.loc[table["attempts"] > 1, [
+        "model", "solver", "attempts", "elapsed_median", "elapsed_iqr", "elapsed_cv"]].copy()
+    variability["high_variability"] = variability["elapsed_cv"] > options["variability threshold"]
+    variability.to_csv(outputdir.joinpath(f"variability.{get_run_dir(run_number).name}.csv"), index=False)
+    if variability.empty:
+        print("No repeated jobs in the run.")
+        return variability
+    print(f"Solver time variability of {len(variability)} repeated jobs: "
+          f"median coefficient of variation {variability['elapsed_cv'].median():.3f}.")
+    high_variability = variability[variability["high_variability"]]
+    print(f"{len(high_variability)} jobs have a coefficient of variation above {options['variability threshold']}:")
+    for job in high_variability.itertuples():
+        print(f" - {job.solver} {job.model}: median {job.elapsed_median:.2f}s, IQR {job.elapsed_iqr:.2f}s, "
+              f"CV {job.elapsed_cv:.3f}")
+    return variability
+
+
+def report_subsolver_times(run_number: Optional[int] = None) -> pandas.DataFrame:
+    """
+    Reports where the time of the decomposition solvers goes, per solver and model type: the subsolver time
+    by subproblem category and the decomposition overhead outside of the subsolvers, as sums over the jobs and
+    as percentages of their total. The subsolver interface time is part of the subsolver times, and is reported
+    as a percentage of the total as well.
+    """
+    table = _collect_run_table(run_number)
+    category_columns = [f"subsolver_{category}_time" for category in subproblem_categories]
+    time_columns = category_columns + ["decomposition_overhead_time", "subsolver_interface_time"]
+    decomposition = table[table["subsolver_solves"].notna()].copy()
+    decomposition[time_columns + ["subsolver_solves"]] = decomposition[
+        time_columns + ["subsolver_solves"]].astype(float)
+    summary = decomposition.groupby(["solver", "model_type"], observed=True, sort=True).agg(
+        jobs=("model", "size"), subsolver_solves=("subsolver_solves", "sum"),
+        **{column: (column, "sum") for column in time_columns}).reset_index()
+    total_time = summary[category_columns + ["decomposition_overhead_time"]].sum(axis=1)
+    for column in time_columns:
+        summary[column.replace("_time", "_percent")] = 100 * summary[column] / total_time
+    summary.to_csv(outputdir.joinpath(f"subsolver.times.{get_run_dir(run_number).name}.csv"), index=False)
+    if summary.empty:
+        print("No jobs with subsolver timings in the run.")
+        return summary
+    print(f"Time decomposition of {len(decomposition)} jobs with subsolver timings (percent of total):")
+    percent_columns = [column.replace("_time", "_percent") for column in time_columns]
+    with pandas.option_context(
+            'display.max_rows', None, 'display.max_columns', None, 'expand_frame_repr', False):
+        print(summary[["solver", "model_type", "jobs", "subsolver_solves"] + percent_columns].to_string(
+            index=False, float_format="{:.1f}".format))
+    return summary
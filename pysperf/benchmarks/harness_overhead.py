@@ -0,0 +1,138 @@
+"""
+Benchmark of the harness overhead, with mock solvers on synthetic models (see pysperf/solvers/mock.py and
+pysperf/models/synthetic.py).
+
+For runs of each number of jobs, times:
+- the setup of the run (job directories, scripts and configurations),
+- the harness overhead per job: the wall time of a sample of jobs executed by the serial run manager, with mock
+  solvers that spend no solver time (process start-up, imports, model build, and result writing),
+- the analysis of the run: collecting the run information, building the results table from the job results,
+  and building it again from the ingestion index.
+The other jobs of the run are completed in-process, with mock solver results written as the job runner would.
+The runs are created in a temporary directory.
+
+Usage: python -m pysperf.benchmarks.harness_overhead [--jobs 1000 10000 100000] [--sample 10] [--model-size 10]
+"""
+import os
+import shutil
+import tempfile
+from argparse import ArgumentParser
+from contextlib import redirect_stdout
+from math import ceil
+from pathlib import Path
+from statistics import median
+from time import monotonic
+from typing import List
+
+import yaml
+
+from pysperf import analysis, run_manager
+from pysperf.calibration import get_host_calibration
+from pysperf.config import (
+    cache_internal_options_to_file, get_formatted_time_now, job_model_built_filename, job_result_filename,
+    job_solve_done_filename, job_start_filename, job_stop_filename, models, options, )
+from pysperf.models.synthetic import register_synthetic_models, synthetic_model_prefix
+from pysperf.serial_run_manager import execute_jobs
+from pysperf.solvers.mock import draw_mock_outcome, mock_solver_profiles, register_mock_solvers
+
+
+def _complete_job_in_process(run_dir: Path, model_name: str, solver_name: str, calibration) -> None:
+    """Writes the breadcrumbs and result file of a mock solver job, as the job runner would."""
+    job_dir = run_dir.joinpath(solver_name, model_name)
+    outcome = draw_mock_outcome(solver_name, model_name)
+    job_dir.joinpath(job_start_filename).touch()
+    job_dir.joinpath(job_model_built_filename).touch()
+    if outcome.failure == 'crash':
+        return  # The job process ends without a stop breadcrumb
+    if outcome.failure is None:
+        job_time = get_formatted_time_now()
+        job_result = {
+            'model_build_start_time': job_time, 'model_build_end_time': job_time,
+            'solver_start_time': job_time, 'solver_end_time': job_time,
+            'solver_run_time': outcome.solver_time, 'pyomo_solver_status': 'ok',
+            'termination_condition': outcome.termination_condition, 'LB': outcome.LB, 'UB': outcome.UB,
+            'iterations': outcome.iterations, 'nodes': outcome.nodes,
+            'solver_threads': 1, 'hostname': calibration.hostname, 'cpu_model': calibration.cpu_model,
+            'calibration_time': calibration.calibration_time, 'time_limit': options.time_limit,
+        }
+        with job_dir.joinpath(job_result_filename).open('w') as result_file:
+            yaml.safe_dump(job_result, result_file)
+        job_dir.joinpath(job_solve_done_filename).touch()
+    job_dir.joinpath(job_stop_filename).touch()
+
+
+def _time_run(num_models: int, model_names: List[str], sample_size: int) -> dict:
+    timings = {"models": num_models}
+    start_time = monotonic()
+    run_manager.setup_new_matrix_run(
+        model_set=set(model_names[:num_models]), solver_set=set(mock_solver_profiles))
+    timings["setup"] = monotonic() - start_time
+    run_dir = run_manager.get_run_dir()
+    jobs = run_manager.this_run_config.jobs
+    timings["jobs"] = len(jobs)
+
+    job_times = []
+    for job in jobs[:sample_size]:
+        start_time = monotonic()
+        execute_jobs(run_dir, [job])
+        job_times.append(monotonic() - start_time)
+    timings["job_overhead_median"] = median(job_times) if job_times else None
+    calibration = get_host_calibration()
+    for model_name, solver_name in jobs[sample_size:]:
+        _complete_job_in_process(run_dir, model_name, solver_name, calibration)
+
+    for step, analysis_step in [
+        ("run_info", lambda: analysis.collect_run_info(options["current run number"])),
+        ("table_cold", lambda: analysis._collect_run_table(options["current run number"])),
+        ("table_warm", lambda: analysis._collect_run_table(options["current run number"])),
+    ]:
+        start_time = monotonic()
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            analysis_step()
+        timings[step] = monotonic() - start_time
+    return timings
+
+
+def run_benchmark(job_counts: List[int], sample_size: int, model_size: int, base_dir: str = None) -> None:
+    # The mock solvers spend no solver time. The job processes register the same mock solvers and models.
+    num_models = ceil(max(job_counts) / len(mock_solver_profiles))
+    os.environ.update({
+        "PYSPERF_MOCK_SOLVERS": "1", "PYSPERF_MOCK_TIME_SCALE": "0",
+        "PYSPERF_SYNTHETIC_MODELS": str(num_models), "PYSPERF_SYNTHETIC_MODEL_SIZE": str(model_size)})
+    register_mock_solvers()
+    register_synthetic_models(num_models, model_size)
+    model_names = sorted(name for name in models if name.startswith(synthetic_model_prefix))
+
+    original_runsdir, original_run_number = run_manager.runsdir, options.get("current run number", None)
+    tmpdir = tempfile.mkdtemp(prefix="pysperf_harness_", dir=base_dir)
+    run_manager.runsdir = Path(tmpdir)
+    try:
+        results = []
+        for job_count in job_counts:
+            print(f"Timing a run of {job_count} mock solver jobs ({sample_size} executed).")
+            results.append(_time_run(ceil(job_count / len(mock_solver_profiles)), model_names, sample_size))
+    finally:
+        run_manager.runsdir = original_runsdir
+        options["current run number"] = original_run_number
+        cache_internal_options_to_file()
+        shutil.rmtree(tmpdir)
+    print()
+    print(f"{'jobs':>8}{'setup (s)':>11}{'ms/job':>8}{'job overhead (s)':>18}"
+          f"{'run info (s)':>14}{'table (s)':>11}{'from index (s)':>16}")
+    for timings in results:
+        job_overhead = timings["job_overhead_median"]
+        print(f"{timings['jobs']:>8}{timings['setup']:>11.2f}{1000 * timings['setup'] / timings['jobs']:>8.2f}"
+              f"{job_overhead if job_overhead is not None else float('nan'):>18.2f}"
+              f"{timings['run_info']:>14.2f}{timings['table_cold']:>11.2f}{timings['table_warm']:>16.2f}")
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description="Benchmark the harness overhead with mock solvers on synthetic models.")
+    parser.add_argument('--jobs', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help="Numbers of jobs of the benchmarked runs.")
+    parser.add_argument('--sample', type=int, default=10,
+                        help="Number of jobs of each run executed by the serial run manager (median overhead).")
+    parser.add_argument('--model-size', type=int, default=10, help="Continuous variables per synthetic model.")
+    parser.add_argument('--dir', help="Directory in which to create the benchmark runs.")
+    args = parser.parse_args()
+    run_benchmark(args.jobs, args.sample, args.model_size, args.dir)
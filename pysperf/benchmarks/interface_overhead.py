@@ -0,0 +1,73 @@
+"""
+Benchmark of solver interface overhead.
+
+Solves library models with Pyomo solver interfaces, and reports the time spent by each interface writing the model,
+launching and running the solver, and reading the results back, separately from the time reported by the solver.
+GAMS solvers are given as gams:<solver>. Persistent interfaces translate the model in set_instance, which is
+timed as writing. GDP models are reformulated with gdp.bigm before solving, outside of the timings.
+
+Usage: python -m pysperf.benchmarks.interface_overhead --models 8PP LeeEx1 [--interfaces gams:cplex cbc glpk]
+       [--repeats 3]
+"""
+from argparse import ArgumentParser
+from typing import List
+
+import pandas
+from pyomo.environ import SolverFactory, TransformationFactory
+from pyomo.gdp import Disjunct
+
+from pysperf.config import options
+from pysperf.model_library import models
+from pysperf.solver_library_tools import get_reported_solver_time, time_pyomo_solve
+
+_default_interfaces = ["gams:cplex", "gurobi_persistent", "cplex_persistent", "appsi_highs", "cbc", "glpk", "scip"]
+_time_columns = ["write", "solve", "read", "other", "total", "reported"]
+
+
+def _get_interface_solver(interface: str):
+    """Returns the Pyomo solver object and solve keyword arguments of an interface."""
+    if interface.startswith("gams:"):
+        return SolverFactory('gams'), dict(solver=interface[len("gams:"):])
+    return SolverFactory(interface), dict(timelimit=options.time_limit)
+
+
+def run_benchmark(model_names: List[str], interfaces: List[str], repeats: int) -> pandas.DataFrame:
+    available_interfaces = []
+    for interface in interfaces:
+        pyomo_solver, _ = _get_interface_solver(interface)
+        if pyomo_solver.available(exception_flag=False):
+            available_interfaces.append(interface)
+        else:
+            print(f"Skipping unavailable interface {interface}.")
+    records = []
+    for model_name in model_names:
+        for interface in available_interfaces:
+            for attempt in range(repeats):
+                pyomo_model = models[model_name].build_function()
+                if next(pyomo_model.component_data_objects(Disjunct, active=True), None) is not None:
+                    TransformationFactory('gdp.bigm').apply_to(pyomo_model)
+                pyomo_solver, solve_kwargs = _get_interface_solver(interface)
+                pyomo_results, interface_times = time_pyomo_solve(pyomo_solver, pyomo_model, **solve_kwargs)
+                records.append({
+                    "model": model_name, "interface": interface, "attempt": attempt,
+                    **interface_times, "reported": get_reported_solver_time(pyomo_results)})
+    results = pandas.DataFrame.from_records(records, columns=["model", "interface", "attempt"] + _time_columns)
+    # Phases that an interface does not time separately are NaN
+    results[_time_columns] = results[_time_columns].astype(float)
+    summary = results.groupby(["model", "interface"], sort=False)[_time_columns].median()
+    summary["overhead"] = summary["total"] - summary["reported"]
+    summary["overhead_percent"] = 100 * summary["overhead"] / summary["total"]
+    return summary
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description="Benchmark solver interface overhead.")
+    parser.add_argument('--models', nargs='+', required=True, help="Library models to solve.")
+    parser.add_argument('--interfaces', nargs='+', default=_default_interfaces,
+                        help="Pyomo solver interfaces, or gams:<solver> for GAMS solvers.")
+    parser.add_argument('--repeats', type=int, default=3, help="Solves per model and interface (median reported).")
+    args = parser.parse_args()
+    summary = run_benchmark(args.models, args.interfaces, args.repeats)
+    print("Median times (s). Phases not timed separately by an interface are included in 'other'.")
+    with pandas.option_context('display.max_rows', None, 'display.width', 200):
+        print(summary.round(4))
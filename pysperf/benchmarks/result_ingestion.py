@@ -0,0 +1,102 @@
+"""
+Benchmark of job result ingestion throughput.
+
+Builds a synthetic run tree of job result files and times the ingestion of the results table records
+with the pure Python and C YAML loaders, serially and with a thread pool, and the re-ingestion of an
+unchanged run from the ingestion index.
+
+Usage: python -m pysperf.benchmarks.result_ingestion [--results 100000] [--threads 8] [--dir DIR]
+Use --dir to place the synthetic run tree on the file system of interest (e.g. a network drive).
+"""
+import random
+import shutil
+import tempfile
+from argparse import ArgumentParser
+from pathlib import Path
+from time import monotonic
+from typing import List, Tuple
+
+import yaml
+
+from pysperf import analysis
+from pysperf.config import job_result_filename, options, results_index_filename
+
+_num_solvers = 20
+
+
+def make_synthetic_run_tree(run_dir: Path, num_results: int) -> List[Tuple[str, str]]:
+    """Writes synthetic job result files, in the format of the job runner, and returns the jobs."""
+    rng = random.Random(0)
+    jobs = [(f"model{job_num // _num_solvers}", f"solver{job_num % _num_solvers}") for job_num in range(num_results)]
+    for model_name, solver_name in jobs:
+        job_dir = run_dir.joinpath(solver_name, model_name)
+        job_dir.mkdir(parents=True)
+        objective_value = rng.uniform(-1000, 1000)
+        job_result = {
+            'model_build_start_time': '2020-01-01 12:00:00.000000',
+            'model_build_end_time': '2020-01-01 12:00:01.000000',
+            'solver_start_time': '2020-01-01 12:00:01.000000',
+            'solver_end_time': '2020-01-01 12:00:31.000000',
+            'solver_run_time': rng.lognormvariate(1, 1.5),
+            'termination_condition': rng.choice(['optimal', 'optimal', 'maxTimeLimit', 'infeasible']),
+            'pyomo_solver_status': 'ok',
+            'LB': objective_value - rng.uniform(0, 10),
+            'UB': objective_value,
+            'iterations': rng.randint(1, 100),
+            'solver_threads': 1,
+            'hostname': 'synthetic',
+            'cpu_model': 'synthetic',
+            'calibration_time': 1.0,
+            'time_limit': 300,
+        }
+        with job_dir.joinpath(job_result_filename).open('w') as result_file:
+            yaml.safe_dump(job_result, result_file)
+    return jobs
+
+
+def _time_ingestion(run_dir: Path, jobs: List[Tuple[str, str]], loader, threads: int, use_index: bool) -> float:
+    if not use_index:
+        run_dir.joinpath(results_index_filename).unlink(missing_ok=True)
+    analysis._YamlSafeLoader = loader
+    options["result ingestion threads"] = threads
+    start_time = monotonic()
+    analysis._ingest_run_results(run_dir, jobs)
+    return monotonic() - start_time
+
+
+def run_benchmark(num_results: int, threads: int, base_dir: str = None) -> None:
+    original_loader, original_threads = analysis._YamlSafeLoader, options.get("result ingestion threads", 1)
+    tmpdir = tempfile.mkdtemp(prefix="pysperf_ingestion_", dir=base_dir)
+    try:
+        run_dir = Path(tmpdir).joinpath("run1")
+        print(f"Writing {num_results} synthetic job results to {run_dir}.")
+        jobs = make_synthetic_run_tree(run_dir, num_results)
+        cases = [
+            ("SafeLoader, serial", yaml.SafeLoader, 1, False),
+            ("CSafeLoader, serial", getattr(yaml, 'CSafeLoader', yaml.SafeLoader), 1, False),
+            (f"CSafeLoader, {threads} threads", getattr(yaml, 'CSafeLoader', yaml.SafeLoader), threads, False),
+            (f"Unchanged run from index, {threads} threads", original_loader, threads, True),
+        ]
+        baseline_time = None
+        timings = []
+        for case_name, loader, num_threads, use_index in cases:
+            elapsed = _time_ingestion(run_dir, jobs, loader, num_threads, use_index)
+            baseline_time = baseline_time or elapsed
+            timings.append((case_name, elapsed))
+        print()
+        print(f"{'Ingestion':<45}{'time (s)':>10}{'results/s':>12}{'speedup':>9}")
+        for case_name, elapsed in timings:
+            print(f"{case_name:<45}{elapsed:>10.2f}{num_results / elapsed:>12.0f}{baseline_time / elapsed:>8.1f}x")
+    finally:
+        analysis._YamlSafeLoader = original_loader
+        options["result ingestion threads"] = original_threads
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description="Benchmark job result ingestion throughput.")
+    parser.add_argument('--results', type=int, default=100000, help="Number of synthetic job results.")
+    parser.add_argument('--threads', type=int, default=8, help="Number of ingestion threads.")
+    parser.add_argument('--dir', help="Directory in which to create the synthetic run tree.")
+    args = parser.parse_args()
+    run_benchmark(args.results, args.threads, args.dir)
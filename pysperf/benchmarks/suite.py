@@ -0,0 +1,162 @@
+"""
+Benchmark suite of the harness itself, with baselines to catch regressions (pysperf bench).
+
+Times, as the median of repeats:
+- interpreter start-up, and the import of the model and solver registries in a new interpreter,
+- compute_model_stats with a warm model statistics cache,
+- setup_new_matrix_run of a synthetic run of mock solver jobs (see harness_overhead),
+- the job runner: a mock solver job that spends no solver time, executed by the serial run manager,
+- collect_run_info and export_to_excel of the synthetic run.
+The synthetic runs and exports are created in a temporary directory.
+
+The timings are written to a JSON file, and compared to the baseline of the host, if there is one. A benchmark
+regresses if it is slower than the baseline by more than both the relative and absolute bench thresholds.
+"""
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+from contextlib import redirect_stdout
+from math import ceil
+from pathlib import Path
+from statistics import median
+from time import monotonic
+from typing import Callable, Dict, Optional
+
+from pysperf import analysis, run_manager
+from pysperf.calibration import get_host_calibration
+from pysperf.config import cache_internal_options_to_file, get_formatted_time_now, models, options, outputdir
+from pysperf.model_library import compute_model_stats
+from pysperf.models.synthetic import register_synthetic_models, synthetic_model_prefix
+from pysperf.serial_run_manager import execute_jobs
+from pysperf.solvers.mock import mock_solver_profiles, register_mock_solvers
+from .harness_overhead import _complete_job_in_process
+
+bench_dir = outputdir.joinpath("bench/")
+# The package directory is importable from its parent, also if pysperf is not installed
+_package_parent_dir = Path(__file__).resolve().parents[2]
+
+
+def _time_repeats(function: Callable[[], None], repeats: int) -> float:
+    """Returns the median wall time of the repeated calls of the function, with their output suppressed."""
+    times = []
+    for _ in range(repeats):
+        start_time = monotonic()
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            function()
+        times.append(monotonic() - start_time)
+    return median(times)
+
+
+def _run_python(code: str, env: dict) -> None:
+    subprocess.run([sys.executable, "-c", code], cwd=_package_parent_dir, env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def _get_baseline_path(hostname: str) -> Path:
+    return bench_dir.joinpath(f"{hostname}.baseline.json")
+
+
+def run_benchmarks(num_jobs: int, repeats: int) -> Dict[str, float]:
+    """Returns the median times (seconds) of the harness benchmarks on a synthetic run of the number of jobs."""
+    # The registries are imported without the mock solvers and synthetic models, as by users.
+    library_env = {key: value for key, value in os.environ.items() if not key.startswith("PYSPERF_")}
+    num_models = ceil(num_jobs / len(mock_solver_profiles))
+    os.environ.update({
+        "PYSPERF_MOCK_SOLVERS": "1", "PYSPERF_MOCK_TIME_SCALE": "0", "PYSPERF_SYNTHETIC_MODELS": str(num_models)})
+    register_mock_solvers()
+    register_synthetic_models(num_models)
+    model_set = {name for name in models if name.startswith(synthetic_model_prefix)}
+    compute_model_stats()  # Warm the model statistics cache
+
+    timings = {
+        "interpreter_startup": _time_repeats(lambda: _run_python("pass", library_env), repeats),
+        "registry_import": _time_repeats(lambda: _run_python(
+            "import pysperf.model_library, pysperf.solver_library", library_env), repeats),
+        "compute_model_stats": _time_repeats(compute_model_stats, repeats),
+    }
+    original_runsdir, original_outputdir = run_manager.runsdir, analysis.outputdir
+    original_run_number = options.get("current run number", None)
+    tmpdir = tempfile.mkdtemp(prefix="pysperf_bench_")
+    run_manager.runsdir = Path(tmpdir)
+    analysis.outputdir = Path(tmpdir)
+    try:
+        timings["setup_new_matrix_run"] = _time_repeats(lambda: run_manager.setup_new_matrix_run(
+            model_set=model_set, solver_set=set(mock_solver_profiles)), repeats)
+        run_dir = run_manager.get_run_dir()
+        jobs = run_manager.this_run_config.jobs
+        timings["job_runner"] = _time_repeats(lambda: execute_jobs(run_dir, [jobs[0]]), repeats)
+        calibration = get_host_calibration()
+        for model_name, solver_name in jobs[1:]:
+            _complete_job_in_process(run_dir, model_name, solver_name, calibration)
+        run_number = options["current run number"]
+        timings["collect_run_info"] = _time_repeats(lambda: analysis.collect_run_info(run_number), repeats)
+        timings["export_to_excel"] = _time_repeats(lambda: analysis.export_to_excel([run_number]), repeats)
+    finally:
+        run_manager.runsdir, analysis.outputdir = original_runsdir, original_outputdir
+        options["current run number"] = original_run_number
+        cache_internal_options_to_file()
+        shutil.rmtree(tmpdir)
+    return timings
+
+
+def run_benchmark_suite(num_jobs: int = 1000, repeats: int = 3, save_baseline: bool = False,
+                        baseline_path: Optional[Path] = None) -> int:
+    """
+    Runs the harness benchmarks, writes their timings, and compares them to the baseline.
+
+    Returns
+    -------
+    Exit code: 1 if any benchmark regressed from the baseline, otherwise 0.
+    """
+    calibration = get_host_calibration()
+    timings = run_benchmarks(num_jobs, repeats)
+    bench_result = {
+        "time": get_formatted_time_now(),
+        "hostname": calibration.hostname,
+        "cpu_model": calibration.cpu_model,
+        "python": platform.python_version(),
+        "jobs": num_jobs,
+        "repeats": repeats,
+        "timings": timings,
+    }
+    bench_dir.mkdir(exist_ok=True, parents=True)
+    with bench_dir.joinpath(f"{calibration.hostname}.latest.json").open('w') as bench_file:
+        json.dump(bench_result, bench_file, indent=2)
+    baseline_path = Path(baseline_path) if baseline_path else _get_baseline_path(calibration.hostname)
+    if save_baseline:
+        with baseline_path.open('w') as baseline_file:
+            json.dump(bench_result, baseline_file, indent=2)
+        print(f"Baseline written to '{baseline_path}'.")
+
+    baseline = None
+    if baseline_path.exists() and not save_baseline:
+        with baseline_path.open('r') as baseline_file:
+            baseline = json.load(baseline_file)
+        if (baseline["hostname"], baseline["jobs"]) != (calibration.hostname, num_jobs):
+            print(f"Warning: the baseline was measured on {baseline['hostname']} with {baseline['jobs']} jobs.")
+    relative_threshold = options["bench relative time threshold"]
+    absolute_threshold = options["bench absolute time threshold"]
+    regressions = []
+    print(f"Harness benchmarks ({num_jobs} jobs, median of {repeats}):")
+    print(f"{'benchmark':<24}{'time (s)':>10}{'baseline (s)':>14}{'change':>9}")
+    for benchmark, bench_time in timings.items():
+        base_time = baseline["timings"].get(benchmark, None) if baseline else None
+        if base_time is None:
+            print(f"{benchmark:<24}{bench_time:>10.3f}")
+            continue
+        time_change = bench_time - base_time
+        relative_change = time_change / base_time if base_time else float('inf')
+        regressed = time_change > absolute_threshold and relative_change > relative_threshold
+        if regressed:
+            regressions.append(benchmark)
+        print(f"{benchmark:<24}{bench_time:>10.3f}{base_time:>14.3f}{relative_change:>+9.1%}"
+              f"{'  REGRESSION' if regressed else ''}")
+    if baseline is None and not save_baseline:
+        print(f"No baseline at '{baseline_path}'. Save one with --save-baseline.")
+    elif regressions:
+        print(f"{len(regressions)} harness benchmarks regressed: {', '.join(regressions)}")
+    return 1 if regressions else 0
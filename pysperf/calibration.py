@@ -0,0 +1,154 @@
+"""
+Machine speed calibration.
+
+Every job runner times a fixed reference workload the first time it executes on a host,
+and caches the result per host name. Solver times measured on different hosts can then be
+normalized to a reference machine, and time limits may be scaled to match.
+The workload runs outside of the job time limits: the serial run manager calibrates its host before
+starting the jobs, and the job runner calibrates before applying its resource limits.
+"""
+import logging
+import os
+import platform
+import socket
+import tempfile
+from pathlib import Path
+from time import monotonic
+from typing import Optional
+
+import pyomo.environ as pyo
+import yaml
+from pyutilib.misc import Container
+
+from .config import _calibration_cache_dir, get_formatted_time_now, options
+
+
+def _get_cpu_model() -> str:
+    try:
+        with open('/proc/cpuinfo') as cpuinfo:
+            for line in cpuinfo:
+                if line.startswith('model name'):
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def _build_reference_model(size: int = 2000) -> pyo.ConcreteModel:
+    m = pyo.ConcreteModel()
+    m.I = pyo.RangeSet(size)
+    m.x = pyo.Var(m.I, bounds=(0, 10), initialize=1)
+    m.y = pyo.Var(m.I, domain=pyo.Binary)
+    m.linking = pyo.Constraint(m.I, rule=lambda m, i: m.x[i] <= 10 * m.y[i])
+    m.nonlinear = pyo.Constraint(
+        m.I, rule=lambda m, i: m.x[i] ** 2 + pyo.exp(0.1 * m.x[i % size + 1]) >= 2 - m.y[i])
+    m.budget = pyo.Constraint(expr=sum(m.y[i] for i in m.I) <= size // 2)
+    m.obj = pyo.Objective(expr=sum(m.x[i] + (i % 7) * m.y[i] for i in m.I))
+    return m
+
+
+def _build_reference_solve_model(size: int = 100) -> pyo.ConcreteModel:
+    m = pyo.ConcreteModel()
+    m.I = pyo.RangeSet(size)
+    m.x = pyo.Var(m.I, bounds=(0, 10), initialize=1)
+    m.demand = pyo.Constraint(m.I, rule=lambda m, i: m.x[i] + m.x[i % size + 1] >= 1 + i % 3)
+    m.lp_obj = pyo.Objective(expr=sum((i % 7 + 1) * m.x[i] for i in m.I))
+    m.nlp_obj = pyo.Objective(expr=sum((m.x[i] - i % 5) ** 2 + pyo.exp(0.1 * m.x[i]) for i in m.I))
+    m.nlp_obj.deactivate()
+    return m
+
+
+def _reference_solves_available() -> bool:
+    return pyo.SolverFactory('gams').available(exception_flag=False)
+
+
+def _run_reference_workload(reference_solves: bool) -> float:
+    """
+    Times the fixed reference workload: a Pyomo model build, followed by the NL and GAMS writers,
+    and if requested, the solves of a small LP and NLP through GAMS with its default solvers.
+    """
+    start_time = monotonic()
+    m = _build_reference_model()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        m.write(str(Path(tmpdir).joinpath('reference.nl')))
+        m.write(str(Path(tmpdir).joinpath('reference.gms')))
+        if reference_solves:
+            m = _build_reference_solve_model()
+            pyo.SolverFactory('gams').solve(m, tmpdir=tmpdir)
+            m.lp_obj.deactivate()
+            m.nlp_obj.activate()
+            pyo.SolverFactory('gams').solve(m, tmpdir=tmpdir)
+    return monotonic() - start_time
+
+
+def _calibration_cache_path(hostname: str) -> Path:
+    return _calibration_cache_dir.joinpath(f"{hostname}.pfcache")
+
+
+def _load_calibration(hostname: str) -> Optional[Container]:
+    try:
+        with _calibration_cache_path(hostname).open('r') as cachefile:
+            return Container(**yaml.safe_load(cachefile))
+    except FileNotFoundError:
+        return None
+
+
+def get_host_calibration() -> Container:
+    """
+    Returns the calibration of the current host, running the reference workload if it is not yet cached.
+
+    The calibration time is the best of several repeats of the reference workload.
+    The reference solves are skipped on hosts without GAMS, which the calibration records.
+    """
+    hostname = socket.gethostname()
+    calibration = _load_calibration(hostname)
+    if calibration is not None:
+        return calibration
+    calibration = Container()
+    calibration.hostname = hostname
+    calibration.cpu_model = _get_cpu_model()
+    calibration.reference_solves = _reference_solves_available()
+    if not calibration.reference_solves:
+        logging.warning(f"GAMS is not available on {hostname}: its calibration omits the reference solves, "
+                        f"and is only comparable to those of other hosts without GAMS.")
+    calibration.calibration_time = min(
+        _run_reference_workload(calibration.reference_solves) for _ in range(3))
+    calibration.calibrated_at = get_formatted_time_now()
+    _calibration_cache_dir.mkdir(exist_ok=True, parents=True)
+    # Write to a temporary file first, so that concurrent jobs on the same host never see a partial file.
+    cache_path = _calibration_cache_path(hostname)
+    tmp_cache_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    with tmp_cache_path.open('w') as cachefile:
+        yaml.safe_dump(dict(**calibration), cachefile)
+    tmp_cache_path.replace(cache_path)
+    return calibration
+
+
+def get_reference_calibration_time() -> Optional[float]:
+    """
+    Returns the calibration time of the reference machine, or None if no reference is configured
+    or the reference machine is not calibrated yet.
+    """
+    reference_machine = options.get("reference machine", None)
+    if reference_machine is None:
+        return None
+    reference_calibration = _load_calibration(reference_machine)
+    if reference_calibration is None:
+        logging.warning(f"Reference machine '{reference_machine}' has no cached calibration, so times are not "
+                        f"normalized. Run a pysperf job on it first.")
+        return None
+    return reference_calibration.calibration_time
+
+
+def get_time_normalization_factor(calibration_time: Optional[float],
+                                  reference_calibration_time: Optional[float] = None) -> Optional[float]:
+    """
+    Returns the factor that converts times measured on a host with the given calibration time
+    into times on the reference machine.
+    If the reference calibration time is not given, it is loaded from the calibration cache.
+    """
+    if reference_calibration_time is None:
+        reference_calibration_time = get_reference_calibration_time()
+    if reference_calibration_time is None or not calibration_time:
+        return None
+    return reference_calibration_time / calibration_time
@@ -0,0 +1,90 @@
+"""
+Run-versus-run comparison, to detect performance regressions between benchmarking runs
+(e.g. after upgrading Pyomo or a solver).
+"""
+import numpy
+import pandas
+
+from .analysis import _collect_run_table
+from .config import outputdir, options
+from .run_manager import this_run_config
+
+comparison_classes = ["newly solved", "newly failed", "faster", "slower", "changed tc", "unchanged"]
+_regression_classes = {"newly failed", "slower"}
+
+
+def _get_run_jobs_table(run_number: int) -> pandas.DataFrame:
+    table = _collect_run_table(run_number)
+    # _collect_run_table loads the run configuration. Jobs pruned by racing are not compared.
+    jobs_pruned = this_run_config.get('jobs_pruned', set())
+    jobs = pandas.DataFrame(
+        [job for job in this_run_config.jobs if job not in jobs_pruned], columns=["model", "solver"])
+    return jobs.merge(table, on=["model", "solver"], how="left")
+
+
+def compare_runs(base_run: int, new_run: int, metric: str = "time_to_soln") -> pandas.DataFrame:
+    """
+    Aligns the jobs common to two runs by model and solver, and classifies the change of each job.
+
+    A job is newly solved or newly failed if it reaches the time metric in only one of the runs (failed jobs do not
+    reach it). If it reaches the metric in both runs, it is faster or slower if the time changes by more than both
+    the relative and the absolute comparison time thresholds, and, for repeated jobs, the noise factor times the
+    larger interquartile range of their solver times. Otherwise, the change of termination condition
+    is reported.
+    """
+    base = _get_run_jobs_table(base_run)
+    new = _get_run_jobs_table(new_run)
+    compared = base[["model", "solver", "tc", metric, "elapsed_iqr"]].merge(
+        new[["model", "solver", "tc", metric, "elapsed_iqr"]], on=["model", "solver"], suffixes=("_base", "_new"))
+    base_time = compared[f"{metric}_base"].to_numpy(dtype=float, na_value=numpy.nan)
+    new_time = compared[f"{metric}_new"].to_numpy(dtype=float, na_value=numpy.nan)
+    base_solved = numpy.isfinite(base_time)
+    new_solved = numpy.isfinite(new_time)
+    with numpy.errstate(divide='ignore', invalid='ignore'):  # unsolved jobs have infinite times
+        time_change = new_time - base_time
+        relative_change = time_change / base_time
+    # Repeated jobs measure the noise of their times. Changes within the noise are not significant.
+    noise = numpy.fmax(compared["elapsed_iqr_base"].to_numpy(dtype=float, na_value=numpy.nan),
+                       compared["elapsed_iqr_new"].to_numpy(dtype=float, na_value=numpy.nan))
+    noise = numpy.nan_to_num(noise, nan=0.0) * options["comparison noise factor"]
+    significant = ((numpy.abs(time_change) > options["comparison absolute time threshold"])
+                   & (numpy.abs(relative_change) > options["comparison relative time threshold"])
+                   & (numpy.abs(time_change) > noise))
+    base_tc = compared["tc_base"].fillna("failed").to_numpy()
+    new_tc = compared["tc_new"].fillna("failed").to_numpy()
+    compared["tc_base"], compared["tc_new"] = base_tc, new_tc
+    compared["time_change"] = time_change
+    compared["relative_change"] = relative_change
+    compared["change"] = numpy.select(
+        [~base_solved & new_solved,
+         base_solved & ~new_solved,
+         base_solved & new_solved & significant & (time_change < 0),
+         base_solved & new_solved & significant & (time_change > 0),
+         base_tc != new_tc],
+        comparison_classes[:-1], default="unchanged")
+    return compared
+
+
+def report_run_comparison(base_run: int, new_run: int, metric: str = "time_to_soln") -> int:
+    """
+    Prints and stores the comparison of two runs.
+
+    Returns
+    -------
+    Exit code: 1 if any job is newly failed or slower, otherwise 0.
+    """
+    compared = compare_runs(base_run, new_run, metric)
+    compared.to_csv(outputdir.joinpath(f"compare.run{base_run}.run{new_run}.csv"), index=False)
+    counts = compared["change"].value_counts()
+    print(f"Comparison of {metric} for {len(compared)} jobs common to run{base_run} (base) and run{new_run}:")
+    for change in comparison_classes:
+        print(f" - {change}: {counts.get(change, 0)}")
+    for change in comparison_classes[:-1]:
+        changed_jobs = compared[compared["change"] == change]
+        if changed_jobs.empty:
+            continue
+        print(f"{change.capitalize()} jobs:")
+        for job in changed_jobs.itertuples():
+            print(f" - {job.solver} {job.model}: {getattr(job, f'{metric}_base'):.2f} -> "
+                  f"{getattr(job, f'{metric}_new'):.2f} ({job.tc_base} -> {job.tc_new})")
+    return 1 if counts.reindex(list(_regression_classes)).fillna(0).sum() else 0
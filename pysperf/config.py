@@ -9,6 +9,8 @@ from pyutilib.misc import Container
 models = Container()
 solvers = Container()
 options = Container()
+# Information on the job executed by this process (set by the job runner)
+current_job = Container()
 
 # Make output and runs directories, if they do not exist
 runsdir = Path(__file__).parent.joinpath("output/runs/")
@@ -23,11 +25,17 @@ job_start_filename = ".job_started.log"
 job_stop_filename = ".job_stopped.log"
 job_model_built_filename = ".job_model_built.log"
 job_solve_done_filename = ".job_solve_done.log"
+model_cache_dirname = ".model_cache"
 _internal_config_file = Path(__file__).parent.joinpath('.internal.config.pfcache')
 _model_cache_path = Path(__file__).parent.joinpath('model.info.pfcache')
 run_config_filename = "run.config.pfdata"
+results_table_filename = "results.table"
+results_index_filename = "results.index.pfcache"
 _model_info_log_path = outputdir.joinpath("models.info.log")
 _solver_info_log_path = outputdir.joinpath("solvers.info.log")
+_calibration_cache_dir = outputdir.joinpath("calibration/")
+_profiles_dir = outputdir.joinpath("profiles/")
+_tight_bigm_cache_dir = outputdir.joinpath("bigm/")
 
 # Load in user and internal options caches
 with Path(__file__).parent.joinpath('pysperf.config').open() as _user_config_file:
@@ -46,11 +54,17 @@ def cache_internal_options_to_file() -> None:
         yaml.safe_dump(_internal_config_options, _internal_config_filehandle)
 
 
+def get_solver_thread_count() -> int:
+    """Threads allowed for each solver, so that concurrent jobs do not oversubscribe the processors."""
+    return int(options.processes)
+
+
 def get_base_gams_options_list() -> list:
     return [
         f'option optcr={options.optcr};',
         'option optca=0;',
-        'option solvelink=5;'
+        'option solvelink=5;',
+        f'option threads={get_solver_thread_count()};',
     ]
 
 
@@ -0,0 +1,180 @@
+"""
+Tools for solvers that go through the Pyomo GAMS interface.
+
+The GAMS model file written by Pyomo differs between GAMS solvers only in the solver selection and the
+additional options lines. With GAMS model file caching enabled, the model file is written once per
+model and model processing (e.g. GDP reformulation) into the run model cache, together with the
+symbol map needed to load results, and is reused by every GAMS solver.
+
+The GAMS listing and log files of a solve are kept in the job directory long enough to parse the solver
+statistics that Pyomo does not return (see record_gams_statistics).
+"""
+import json
+import os
+import re
+import shutil
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from time import monotonic
+from typing import Iterable
+
+from pyomo.core.base.component import ComponentUID
+from pyomo.core.base.symbol_map import SymbolMap
+from pyomo.environ import ConcreteModel
+from pyomo.opt import ProblemFormat
+from pyomo.repn.plugins.gams_writer import valid_solvers
+
+from .base_classes import _JobResult
+from .config import current_job, options
+from .model_cache import get_model_cache_dir, get_model_cache_key
+
+_solve_statement = "SOLVE GAMS_MODEL USING "
+
+
+def _insert_solver_options(model_text: str, solver: str, add_options: list) -> str:
+    """Inserts the solver selection and additional options lines, as the Pyomo GAMS writer would."""
+    solve_statement_start = model_text.rindex(_solve_statement)
+    mtype = model_text[solve_statement_start + len(_solve_statement):].split(None, 1)[0]
+    solver_lines = []
+    if solver is not None:
+        if mtype.upper() not in valid_solvers[solver.upper()]:
+            raise ValueError("GAMS writer passed solver (%s) "
+                             "unsuitable for model type (%s)"
+                             % (solver, mtype))
+        solver_lines.append("option %s=%s;\n" % (mtype, solver))
+    if add_options is not None:
+        solver_lines.append("\n* START USER ADDITIONAL OPTIONS\n")
+        for line in add_options:
+            solver_lines.append('\n' + line)
+        solver_lines.append("\n\n* END USER ADDITIONAL OPTIONS\n\n")
+    return model_text[:solve_statement_start] + "".join(solver_lines) + model_text[solve_statement_start:]
+
+
+def _write_gams_model_from_cache(pyomo_model: ConcreteModel, filename: str, io_options: dict, job_result: _JobResult):
+    io_options = dict(io_options)
+    solver = io_options.pop("solver", None)
+    add_options = io_options.pop("add_options", None)
+    cache_key = get_model_cache_key(
+        current_job.model_name, *current_job.get('model_processing', ()),
+        "gams", *(f"{k}={v}" for k, v in sorted(io_options.items())))
+    cache_dir = get_model_cache_dir()
+    cached_model_file = cache_dir.joinpath(f"{cache_key}.gms")
+    cached_symbols_file = cache_dir.joinpath(f"{cache_key}.gms.symbols")
+
+    writer_start_time = monotonic()
+    if cached_symbols_file.exists():
+        job_result.gams_writer_cached = True
+        with cached_symbols_file.open('r') as symbols_file:
+            cached_symbols = json.load(symbols_file)
+        symbol_map = SymbolMap()
+        symbol_map.addSymbols(
+            (ComponentUID(cuid).find_component_on(pyomo_model), symbol) for symbol, cuid in cached_symbols)
+        if not hasattr(pyomo_model, 'solutions'):
+            from pyomo.core.base.PyomoModel import ModelSolutions
+            pyomo_model.solutions = ModelSolutions(pyomo_model)
+        pyomo_model.solutions.add_symbol_map(symbol_map)
+        smap_id = id(symbol_map)
+    else:
+        job_result.gams_writer_cached = False
+        cache_dir.mkdir(exist_ok=True, parents=True)
+        # Write to temporary files first, so that concurrent jobs never read a partial file.
+        # The symbols file is moved last, so that its existence indicates a complete cache entry.
+        tmp_model_file = cached_model_file.with_name(f"{cached_model_file.name}.{os.getpid()}.tmp")
+        tmp_symbols_file = cached_symbols_file.with_name(f"{cached_symbols_file.name}.{os.getpid()}.tmp")
+        _, smap_id = type(pyomo_model).write(
+            pyomo_model, filename=str(tmp_model_file), format=ProblemFormat.gams, io_options=io_options)
+        tmp_model_file.replace(cached_model_file)
+        symbol_map = pyomo_model.solutions.symbol_map[smap_id]
+        with tmp_symbols_file.open('w') as symbols_file:
+            json.dump([(symbol, str(ComponentUID(obj_ref())))
+                       for symbol, obj_ref in symbol_map.bySymbol.items()], symbols_file)
+        tmp_symbols_file.replace(cached_symbols_file)
+    model_text = cached_model_file.read_text()
+    with open(filename, 'w') as model_file:
+        model_file.write(_insert_solver_options(model_text, solver, add_options))
+    job_result.gams_writer_time = monotonic() - writer_start_time
+    return filename, smap_id
+
+
+@contextmanager
+def reuse_gams_model_file(pyomo_model: ConcreteModel, job_result: _JobResult):
+    """
+    Context manager that lets GAMS solves of the model reuse the model file in the run model cache.
+
+    The GAMS writer time and whether the cached file was used are recorded in the job result.
+    Outside of a pysperf job, or if the 'cache GAMS model files' option is off, the model is written as usual.
+    """
+    if not options.get("cache GAMS model files", False) or 'model_name' not in current_job:
+        yield
+        return
+
+    def write(filename=None, format=None, solver_capability=None, io_options={}):
+        if format is not ProblemFormat.gams:
+            return type(pyomo_model).write(pyomo_model, filename, format, solver_capability, io_options)
+        return _write_gams_model_from_cache(pyomo_model, filename, io_options, job_result)
+
+    pyomo_model.write = write
+    try:
+        yield
+    finally:
+        del pyomo_model.write
+
+
+# Prefix of the working directory of each GAMS solve, created in the job directory. The directories are unique,
+# as the racers of a portfolio solve concurrently in the same job directory.
+_gams_working_dir_prefix = "gams."
+_gams_listing_filename = "output.lst"  # As named by the Pyomo GAMS interface
+_gams_log_filename = "gams.log"
+# Solver statistics in the GAMS output, as (job result field, type, pattern) with the value as the first group.
+# The solve summary of the listing reports the status codes, resource usage and iterations. Node counts are
+# only reported by the solvers themselves, in their log or their section of the listing.
+_gams_statistic_patterns = [
+    ("gams_solver_status", int, re.compile(r"^\*{4} SOLVER STATUS\s+(\d+)")),
+    ("gams_model_status", int, re.compile(r"^\*{4} MODEL STATUS\s+(\d+)")),
+    ("gams_resource_usage", float, re.compile(r"^\s*RESOURCE USAGE, LIMIT\s+(\S+)")),
+    ("iterations", int, re.compile(r"^\s*ITERATION COUNT, LIMIT\s+(\d+)")),
+    ("nodes", int, re.compile(r"^\s*Solving Nodes\s*:\s*(\d+)")),  # SCIP
+    ("nodes", int, re.compile(r"^\s*Total no\. of BaR iterations:\s*(\d+)")),  # BARON
+    ("nodes", int, re.compile(r"\(\d+ iterations, (\d+) nodes\)")),  # CPLEX
+]
+
+
+def parse_gams_statistics(output_lines: Iterable[str]) -> dict:
+    """
+    Returns the solver statistics found in lines of GAMS output (listing or log), by job result field.
+
+    The lines are streamed, so that large listings are never held in memory. If a statistic is reported more
+    than once (e.g. by the subproblem solves of DICOPT), the last value is returned.
+    """
+    statistics = {}
+    for line in output_lines:
+        for field, field_type, pattern in _gams_statistic_patterns:
+            match = pattern.search(line)
+            if match:
+                try:
+                    statistics[field] = field_type(match.group(1))
+                except ValueError:  # e.g. NA
+                    pass
+    return statistics
+
+
+@contextmanager
+def record_gams_statistics(job_result: _JobResult):
+    """
+    Context manager that yields the keyword arguments with which GAMS solves keep their listing and log files.
+
+    On exit, the status codes, resource usage, iteration count and node count reported in the files are
+    recorded in the job result, and the files are removed.
+    """
+    gams_working_dir = Path(tempfile.mkdtemp(prefix=_gams_working_dir_prefix, dir=Path.cwd()))
+    try:
+        yield dict(tmpdir=str(gams_working_dir), keepfiles=True,
+                   logfile=str(gams_working_dir.joinpath(_gams_log_filename)))
+    finally:
+        for output_filename in (_gams_log_filename, _gams_listing_filename):
+            output_path = gams_working_dir.joinpath(output_filename)
+            if output_path.exists():
+                with output_path.open('r', errors='replace') as output_file:
+                    job_result.update(parse_gams_statistics(output_file))
+        shutil.rmtree(gams_working_dir, ignore_errors=True)
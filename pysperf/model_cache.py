@@ -0,0 +1,106 @@
+"""
+Cache of processed Pyomo models shared between the jobs of a run.
+
+Jobs that apply identical processing to the same model (e.g. the Big-M reformulation for each of the
+DICOPT-BM, BARON-BM, and SCIP-BM solvers) store the processed model once in the run directory,
+and later jobs load it instead of repeating the work.
+Models are pickled. Pickling failures are logged and disable caching for that model.
+"""
+import copyreg
+import io
+import logging
+import os
+import pickle
+import sys
+import weakref
+from pathlib import Path
+from time import monotonic
+from typing import Optional, Tuple
+
+from pyomo.environ import ConcreteModel
+
+from .config import current_job, model_cache_dirname
+
+
+def _make_weakref(obj):
+    return weakref.ref(obj) if obj is not None else None
+
+
+def _reduce_weakref(ref):
+    # Pyomo transformations keep weak references between components (e.g. disjuncts and their relaxations).
+    # The referenced components are part of the pickled model, so the references can be rebuilt on load.
+    return _make_weakref, (ref(),)
+
+
+def _pickle_model(pyomo_model: ConcreteModel, metadata: dict) -> bytes:
+    buffer = io.BytesIO()
+    pickler = pickle.Pickler(buffer, protocol=pickle.HIGHEST_PROTOCOL)
+    pickler.dispatch_table = copyreg.dispatch_table.copy()
+    pickler.dispatch_table[weakref.ref] = _reduce_weakref
+    pickler.dump({'model': pyomo_model, 'metadata': metadata})
+    return buffer.getvalue()
+
+
+def get_model_cache_dir() -> Optional[Path]:
+    """Returns the model cache directory of the current run, or None if no job is executing."""
+    if 'run_dir' not in current_job:
+        return None
+    return Path(current_job.run_dir).joinpath(model_cache_dirname)
+
+
+def _cache_file_path(cache_key: str) -> Optional[Path]:
+    cache_dir = get_model_cache_dir()
+    if cache_dir is None:
+        return None
+    return cache_dir.joinpath(f"{cache_key}.pickle")
+
+
+def get_model_cache_key(model_name: str, *processing_steps) -> str:
+    """Builds a cache key (usable as a file name) from the model name and a description of its processing."""
+    return "__".join(str(part).replace(os.sep, '_') for part in (model_name,) + processing_steps)
+
+
+def load_cached_model(cache_key: str) -> Tuple[Optional[ConcreteModel], dict]:
+    """
+    Loads a cached model.
+
+    Returns
+    -------
+    The cached model (or None if it is not cached) and the metadata stored with it.
+    """
+    cache_file = _cache_file_path(cache_key)
+    if cache_file is None or not cache_file.exists():
+        return None, {}
+    # Large expression trees need deep recursion to unpickle
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 50000))
+    load_start_time = monotonic()
+    with cache_file.open('rb') as cachefile:
+        cached = pickle.load(cachefile)
+    metadata = cached['metadata']
+    metadata['cache_load_time'] = monotonic() - load_start_time
+    return cached['model'], metadata
+
+
+def cache_model(pyomo_model: ConcreteModel, cache_key: str, **metadata) -> bool:
+    """
+    Stores a model in the model cache of the current run.
+
+    Returns
+    -------
+    True if the model was cached.
+    """
+    cache_file = _cache_file_path(cache_key)
+    if cache_file is None:
+        return False
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 50000))
+    try:
+        pickled_model = _pickle_model(pyomo_model, metadata)
+    except (pickle.PicklingError, TypeError, AttributeError, RecursionError) as err:
+        logging.warning(f"Unable to cache model {cache_key}: {err}")
+        return False
+    cache_file.parent.mkdir(exist_ok=True, parents=True)
+    # Write to a temporary file first, so that concurrent jobs never load a partial file.
+    tmp_cache_file = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+    tmp_cache_file.write_bytes(pickled_model)
+    tmp_cache_file.replace(cache_file)
+    return True
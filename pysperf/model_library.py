@@ -11,6 +11,10 @@ from typing import Callable, Optional, Set
 import pandas
 import pyomo.environ as pyo
 import yaml
+from pyomo.core.expr.current import identify_variables
+from pyomo.core.kernel.component_set import ComponentSet
+from pyomo.gdp import Disjunct
+from pyomo.repn import generate_standard_repn
 from pyomo.util.model_size import build_model_size_report
 
 from .config import _model_cache_path, _model_info_log_path, models
@@ -18,6 +22,9 @@ from .models import *  # Register all models in the library.
 
 from .model_types import ModelType
 
+# Model statistics added after the first model stats caches were written. Cached models without them are recomputed.
+_recent_model_stats_keys = ('nonzeros', 'nonlinear_nonzeros')
+
 
 def _load_from_model_stats_cache():
     try:
@@ -26,7 +33,8 @@ def _load_from_model_stats_cache():
             cached_models = yaml.safe_load_all(cachefile)
             loaded_model_names = set()
             for test_model in cached_models:
-                loaded_model_names.add(test_model['name'])
+                if all(key in test_model for key in _recent_model_stats_keys):
+                    loaded_model_names.add(test_model['name'])
                 if 'model_type' in test_model:
                     test_model['model_type'] = ModelType[test_model['model_type']]
                 library_model = models.get(test_model['name'], None)
@@ -42,9 +50,10 @@ def _load_from_model_stats_cache():
 
 def _cache_model_stats():
     excluded_keys = {"build_function", "opt_value", "best_value"}
+    # Models registered with precomputed statistics (e.g. synthetic models) are kept out of the cache.
     model_info_to_cache = [{k: v for (k, v) in model.items()
                             if k not in excluded_keys and v is not None}
-                           for model in models.values()]
+                           for model in models.values() if not model.precomputed_stats]
     for test_model in model_info_to_cache:
         test_model['model_type'] = test_model['model_type'].name
     # Note: should work equally well with json
@@ -52,6 +61,19 @@ def _cache_model_stats():
         yaml.safe_dump_all(model_info_to_cache, cachefile)
 
 
+def _count_nonzeros(pyomo_model: pyo.ConcreteModel) -> dict:
+    """Counts the (nonlinear) nonzeros of the active constraints, including those of active disjuncts."""
+    nonzeros = 0
+    nonlinear_nonzeros = 0
+    for constr in pyomo_model.component_data_objects(
+            pyo.Constraint, active=True, descend_into=(pyo.Block, Disjunct)):
+        nonzeros += len(ComponentSet(identify_variables(constr.body, include_fixed=False)))
+        if constr.body.polynomial_degree() not in (0, 1):
+            repn = generate_standard_repn(constr.body, quadratic=False)
+            nonlinear_nonzeros += len(ComponentSet(repn.nonlinear_vars))
+    return {'nonzeros': nonzeros, 'nonlinear_nonzeros': nonlinear_nonzeros}
+
+
 def _infer_model_type(test_model):
     if test_model.disjunctions:
         if test_model.nonlinear_constraints:
@@ -85,11 +107,11 @@ def compute_model_stats(only_models: Set[str] = ()):
     _failed_model_names = []
     uncached_models = False
     for test_model in models.values():
-        if test_model.name in models_loaded_from_cache:
+        if test_model.name in models_loaded_from_cache or test_model.precomputed_stats:
             continue
         if only_models and test_model.name not in only_models:
             continue
-        # Model is not already in the cache. Compute its statistics.
+        # Model is not already in the cache, or its cached statistics are outdated. Compute its statistics.
         print(f"Model '{test_model.name}' is not in the cache. "
               "Building the model and computing its statistics now. "
               "This may take some time for larger models.")
@@ -107,6 +129,7 @@ def compute_model_stats(only_models: Set[str] = ()):
         size_report = build_model_size_report(pyomo_model)
         # update test_model object with information from model size report
         test_model.update(size_report.activated)
+        test_model.update(_count_nonzeros(pyomo_model))
         if test_model.model_type is None:
             test_model.model_type = _infer_model_type(test_model)
         # Determine objective sense
@@ -142,7 +165,7 @@ def requires_model_stats(orig_func: Optional[Callable] = None, *, only_models: S
     @functools.wraps(orig_func)
     def wrapper(*args, **kwargs):
         compute_model_stats(only_models=only_models)
-        orig_func(*args, **kwargs)
+        return orig_func(*args, **kwargs)
     return wrapper
 
 
@@ -0,0 +1,76 @@
+"""
+Synthetic models of chosen size, for exercising the harness at scale (see the mock solvers).
+
+If the PYSPERF_SYNTHETIC_MODELS environment variable is set to a number of models, that many models are registered,
+with PYSPERF_SYNTHETIC_MODEL_SIZE continuous variables each (default 10). They alternate between MILP and
+convex MINLP models. Their statistics are known from their construction, so they are registered with the model
+rather than computed by building it, and are not written to the model statistics cache.
+The optimal values are nominal: the mock solvers report their results relative to them.
+"""
+import os
+import random
+
+import pyomo.environ as pyo
+
+from pysperf.config import models
+from pysperf.model_library_registration import register_model
+from pysperf.model_types import ModelType
+
+synthetic_model_prefix = "synthetic"
+_synthetic_model_types = [ModelType.MILP, ModelType.cvxMINLP]
+# Every fifth constraint of a MINLP model is nonlinear
+_nonlinear_constraint_interval = 5
+
+
+def _build_synthetic_model(size: int, nonlinear: bool, seed: int) -> pyo.ConcreteModel:
+    """Builds a random model with `size` continuous variables and constraints, and size // 2 binary variables."""
+    rng = random.Random(seed)
+    m = pyo.ConcreteModel()
+    m.x = pyo.Var(range(size), bounds=(0, 10))
+    m.y = pyo.Var(range(max(1, size // 2)), domain=pyo.Binary)
+    m.c = pyo.ConstraintList()
+    for constr_num in range(size):
+        x1, x2, x3 = rng.sample(range(size), 3) if size >= 3 else (0, 0, 0)
+        body = rng.uniform(1, 5) * m.x[x1] + rng.uniform(1, 5) * m.x[x2] - rng.uniform(1, 5) * m.x[x3]
+        if nonlinear and constr_num % _nonlinear_constraint_interval == 0:
+            body += m.x[x1] ** 2
+        m.c.add(body - 10 * m.y[constr_num % len(m.y)] <= rng.uniform(5, 50))
+    m.obj = pyo.Objective(expr=sum(rng.uniform(-1, 1) * m.x[i] for i in m.x) + sum(m.y[j] for j in m.y))
+    return m
+
+
+def _get_synthetic_model_stats(size: int, nonlinear: bool) -> dict:
+    num_binary = max(1, size // 2)
+    num_nonlinear = len(range(0, size, _nonlinear_constraint_interval)) if nonlinear else 0
+    return {
+        "variables": size + num_binary, "binary_variables": num_binary, "integer_variables": 0,
+        "continuous_variables": size, "constraints": size, "nonlinear_constraints": num_nonlinear,
+        "disjuncts": 0, "disjunctions": 0,
+        "nonzeros": 4 * size, "nonlinear_nonzeros": num_nonlinear,
+        "objective_sense": "minimize",
+        "build_time": 1,  # Rounded up to the second, as for library models
+        "precomputed_stats": True,
+    }
+
+
+def register_synthetic_models(num_models: int, size: int = 10) -> None:
+    """Registers synthetic models, numbered from 1, that are not registered yet."""
+    name_digits = len(str(num_models))
+    rng = random.Random(size)
+    for model_num in range(1, num_models + 1):
+        nominal_opt_value = round(rng.uniform(-1000, 1000), 2)
+        name = f"{synthetic_model_prefix}{model_num:0{name_digits}d}"
+        if name in models:
+            continue
+        model_type = _synthetic_model_types[model_num % len(_synthetic_model_types)]
+        nonlinear = model_type is ModelType.cvxMINLP
+        register_model(
+            name=name,
+            build_function=lambda nonlinear=nonlinear, seed=model_num: _build_synthetic_model(size, nonlinear, seed),
+            model_type=model_type, convex=True, opt_value=nominal_opt_value)
+        models[name].update(_get_synthetic_model_stats(size, nonlinear))
+
+
+if os.environ.get("PYSPERF_SYNTHETIC_MODELS"):
+    register_synthetic_models(
+        int(os.environ["PYSPERF_SYNTHETIC_MODELS"]), int(os.environ.get("PYSPERF_SYNTHETIC_MODEL_SIZE", 10)))
@@ -1,18 +1,17 @@
-import csv
 import textwrap
-from datetime import datetime
-from typing import Optional
+from typing import Iterable
 
+import numpy
+import pandas
 import pyomo.environ as pyo
-import yaml
 
-from pysperf.base_classes import _JobResult, InfeasibleExpected
-from pysperf.config import outputdir, time_format
+from pysperf.analysis import get_typed_results_table
+from pysperf.base_classes import InfeasibleExpected
+from pysperf.config import outputdir
 from pysperf.model_library import models, requires_model_stats
+from pysperf.model_types import ModelType
 from pysperf.solver_library import solvers
-from pysperf.paver_utils.julian import get_julian_datetime
 from pysperf.paver_utils.parse_to_gams import solver_status_to_gams, termination_condition_to_gams_format
-from pysperf.run_manager import _load_run_config, get_run_dir, this_run_config
 
 
 @requires_model_stats
@@ -34,11 +33,25 @@ def create_solu_file() -> None:
                     f"=bestdual=\t{test_model.name}\t{test_model.best_dual}", file=solufile)
 
 
+# GAMS model types of the library model types. Disjunctive models are solved through their MINLP or MIP reformulations.
+_gams_model_types = {
+    ModelType.GDP: 'MINLP', ModelType.cvxGDP: 'MINLP', ModelType.DP: 'MIP',
+    ModelType.MINLP: 'MINLP', ModelType.cvxMINLP: 'MINLP',
+    ModelType.NLP: 'NLP', ModelType.cvxNLP: 'NLP',
+    ModelType.MILP: 'MIP', ModelType.LP: 'LP',
+}
+_gams_model_status_codes = {str(tc): termination_condition_to_gams_format(tc) for tc in pyo.TerminationCondition}
+_gams_solver_status_codes = {str(ss): solver_status_to_gams(ss) for ss in pyo.SolverStatus}
+
+
 @requires_model_stats
-def create_paver_tracefile(run_number: Optional[int] = None):
-    this_run_dir = get_run_dir(run_number)
-    _load_run_config(this_run_dir)
-    # Create trace file
+def create_paver_tracefile(run_numbers: Iterable[int]) -> None:
+    """
+    Creates a Paver trace file of the results of one or more runs.
+
+    Runs are collected and appended to the trace file one at a time. The job results are read through the
+    results table of the analysis, and so share its ingestion index with the other exports.
+    """
     trace_header = """\
         * Trace Record Definition
         * GamsSolve
@@ -48,54 +61,46 @@ def create_paver_tracefile(run_number: Optional[int] = None):
         *  ,ModelStatus,SolverStatus,ObjectiveValue,ObjectiveValueEstimate
         *  ,SolverTime,NumberOfIterations,NumberOfDomainViolations,NumberOfNodes,#empty1
         """
-    trace_data = []
-    for model_name, solver_name in this_run_config.jobs_run - this_run_config.jobs_failed:
-        with this_run_dir.joinpath(solver_name, model_name, "pysperf_result.log").open('r') as resultfile:
-            job_result = _JobResult(**yaml.safe_load(resultfile))
-        _validate_job_result(job_result)
-        test_model = models[model_name]
-        test_solver = solvers[solver_name]
-        trace_line = [
-            model_name,  # Model Name
-            'MINLP',  # LP, MIP, NLP, etc.
-            solver_name,  # ...
-            test_solver.nlp,  # default NLP solver
-            test_solver.milp,  # default MIP solver
-            get_julian_datetime(datetime.strptime(
-                job_result.model_build_start_time, time_format)),  # start day/time of job
-            0 if test_model.objective_sense == "minimize" else 1,  # direction 0=min, 1=max
-            test_model.constraints,  # total number of equations
-            test_model.variables,  # total number of variables
-            # total number of discrete variables
-            test_model.binary_variables + test_model.integer_variables,
-            '',  # 'nznum?',  # number of nonzeros
-            '',  # 'nlz?',  # number of nonlinear nonzeros
-            0,  # 1= optfile included
-            termination_condition_to_gams_format(
-                job_result.termination_condition),
-            # GAMS model return status - see the GAMS return codes section.
-            # GAMS solver return status - see the GAMS return codes section.
-            solver_status_to_gams(pyo.SolverStatus.ok),
-            job_result.UB,  # value of objective function
-            job_result.UB,  # objective function estimate # TODO I think this only works for minimize?
-            job_result.solver_run_time,  # resource time used (sec)
-            job_result.iterations,  # number of solver iterations
-            0,  # dom used
-            0,  # nodes used
-            '# automatically generated by pysperf'
-        ]
-        trace_data.append(trace_line)
-
     with outputdir.joinpath("results.trc").open('w') as tracefile:
         tracefile.write(textwrap.dedent(trace_header))
         tracefile.write('*\n')
-        csvwriter = csv.writer(tracefile)
-        csvwriter.writerows(trace_data)
+        for run_number in run_numbers:
+            trace_data = _get_trace_records(get_typed_results_table([run_number]))
+            trace_data.to_csv(tracefile, header=False, index=False, na_rep='')
 
 
-def _validate_job_result(job_result: _JobResult):
-    if job_result.termination_condition is None or job_result.termination_condition == 'None':
-        job_result.termination_condition = pyo.TerminationCondition.unknown
-    elif type(job_result.termination_condition) == str:
-        job_result.termination_condition = pyo.TerminationCondition(
-            job_result.termination_condition)
+def _get_trace_records(table: pandas.DataFrame) -> pandas.DataFrame:
+    minimizing = (table["sense"] == "minimize").to_numpy()
+    model_types = table["model"].map(lambda model_name: _gams_model_types[models[model_name].model_type])
+    solver_tc = table["tc"].astype(str)
+    solver_status = table["solver_status"].astype(object).fillna(str(pyo.SolverStatus.unknown))
+    return pandas.DataFrame({
+        "InputFileName": table["model"].astype(str),
+        "ModelType": model_types.astype(str),
+        "SolverName": table["solver"].astype(str),
+        "NLP": table["solver"].map(lambda solver_name: solvers[solver_name].nlp).astype(object),
+        "MIP": table["solver"].map(lambda solver_name: solvers[solver_name].milp).astype(object),
+        # start day/time of job
+        "JulianDate": pandas.DatetimeIndex(table["time"]).to_julian_date(),
+        "Direction": numpy.where(minimizing, 0, 1),  # direction 0=min, 1=max
+        "NumberOfEquations": table["constraints"].astype("Int64"),
+        "NumberOfVariables": table["variables"].astype("Int64"),
+        "NumberOfDiscreteVariables": (table["binary_variables"] + table["integer_variables"]).astype("Int64"),
+        "NumberOfNonZeros": table["nonzeros"].astype("Int64"),
+        "NumberOfNonlinearNonZeros": table["nonlinear_nonzeros"].astype("Int64"),
+        "OptionFile": 0,  # 1= optfile included
+        # GAMS model and solver return status - see the GAMS return codes section.
+        # The codes reported by GAMS solvers are used where available.
+        "ModelStatus": table["gams_model_status"].astype("Int64").fillna(
+            solver_tc.map(_gams_model_status_codes).astype("Int64")),
+        "SolverStatus": table["gams_solver_status"].astype("Int64").fillna(
+            solver_status.map(_gams_solver_status_codes).astype("Int64")),
+        # Objective function value is the primal bound, and the estimate is the dual bound.
+        "ObjectiveValue": numpy.where(minimizing, table["UB"], table["LB"]),
+        "ObjectiveValueEstimate": numpy.where(minimizing, table["LB"], table["UB"]),
+        "SolverTime": table["elapsed"],  # resource time used (sec)
+        "NumberOfIterations": table["iterations"].astype("Int64"),
+        "NumberOfDomainViolations": 0,
+        "NumberOfNodes": table["nodes"].astype("Int64"),
+        "#empty1": '# automatically generated by pysperf',
+    })
@@ -0,0 +1,128 @@
+"""
+Preprocessing of the models between build and solve.
+
+The 'preprocessing' option lists the preprocessing steps of a run, applied in order to the built model of each job,
+so that all solvers see the same preprocessed model. Most steps are Pyomo transformations:
+
+- detect_fixed_vars: fix the variables whose bounds are equal,
+- propagate_fixed_vars: fix the variables linked to fixed variables by equalities x = y,
+- propagate_eq_var_bounds: share the bounds of the variables linked by equalities x = y,
+- fbbt: tighten the variable bounds by feasibility-based bounds tightening over the global constraints,
+- prune_disjuncts: deactivate the disjuncts that contain a constraint infeasible within the variable bounds,
+- remove_zero_terms: remove the terms 0 * x from the constraints,
+- deactivate_trivial_constraints: deactivate the constraints without unfixed variables.
+
+The Pyomo transformations only consider the global constraints (not the disjunct constraints).
+FBBT does not tighten bounds through the linear expressions written by remove_zero_terms, so it should precede it.
+The preprocessed model is stored in the model cache of the run, for the other jobs on the same model.
+The job result records the preprocessing time, and the model size before and after preprocessing.
+"""
+import logging
+from time import monotonic
+from typing import Callable, Dict, Sequence, Tuple
+
+from pyomo.contrib.fbbt.fbbt import compute_bounds_on_expr, fbbt
+from pyomo.environ import Block, ConcreteModel, Constraint, TransformationFactory, Var
+from pyomo.gdp import Disjunct
+
+from .config import current_job
+from .model_cache import cache_model, get_model_cache_key, load_cached_model
+
+# Constraints violated by more than this tolerance within the variable bounds make a disjunct infeasible
+_pruning_tolerance = 1E-6
+# Job result fields of the model size before and after preprocessing
+preprocessing_size_columns = [
+    f"preprocessing_{quantity}_{stage}"
+    for stage in ("before", "after") for quantity in ("variables", "constraints", "disjuncts")]
+
+
+def _apply_transformation(xfrm_name: str, **xfrm_options) -> Callable[[ConcreteModel], None]:
+    return lambda pyomo_model: TransformationFactory(xfrm_name).apply_to(pyomo_model, **xfrm_options)
+
+
+def _tighten_bounds(pyomo_model: ConcreteModel) -> None:
+    try:
+        fbbt(pyomo_model)
+    except Exception as err:  # e.g. FBBT detecting infeasibility
+        logging.warning(f"Bounds tightening stopped: {err}")
+
+
+def _is_infeasible_within_bounds(constraint) -> bool:
+    body_lb, body_ub = compute_bounds_on_expr(constraint.body)
+    return ((constraint.upper is not None and body_lb is not None
+             and body_lb > constraint.upper + _pruning_tolerance)
+            or (constraint.lower is not None and body_ub is not None
+                and body_ub < constraint.lower - _pruning_tolerance))
+
+
+def _prune_disjuncts(pyomo_model: ConcreteModel) -> None:
+    for disjunct in pyomo_model.component_data_objects(Disjunct, active=True, descend_into=(Block, Disjunct)):
+        indicator_var = disjunct.indicator_var
+        if indicator_var.is_fixed() and indicator_var.value == 1:
+            continue
+        if (indicator_var.ub == 0 or (indicator_var.is_fixed() and indicator_var.value == 0) or any(
+                _is_infeasible_within_bounds(constraint) for constraint in disjunct.component_data_objects(
+                    Constraint, active=True, descend_into=(Block, Disjunct)))):
+            indicator_var.fix(0)
+            disjunct.deactivate()
+
+
+preprocessing_steps: Dict[str, Callable[[ConcreteModel], None]] = {
+    "detect_fixed_vars": _apply_transformation('contrib.detect_fixed_vars'),
+    "propagate_fixed_vars": _apply_transformation('contrib.propagate_fixed_vars'),
+    "propagate_eq_var_bounds": _apply_transformation('contrib.propagate_eq_var_bounds'),
+    "fbbt": _tighten_bounds,
+    "prune_disjuncts": _prune_disjuncts,
+    "remove_zero_terms": _apply_transformation('contrib.remove_zero_terms'),
+    # Infeasible trivial constraints are left to the solvers to report
+    "deactivate_trivial_constraints": _apply_transformation(
+        'contrib.deactivate_trivial_constraints', tmp=False, ignore_infeasible=True),
+}
+
+
+def get_model_size(pyomo_model: ConcreteModel) -> Dict[str, int]:
+    """Returns the numbers of unfixed variables, active constraints, and active disjuncts of the model."""
+    return {
+        "variables": sum(1 for var in pyomo_model.component_data_objects(
+            Var, active=True, descend_into=(Block, Disjunct)) if not var.fixed),
+        "constraints": sum(1 for _ in pyomo_model.component_data_objects(
+            Constraint, active=True, descend_into=(Block, Disjunct))),
+        "disjuncts": sum(1 for _ in pyomo_model.component_data_objects(
+            Disjunct, active=True, descend_into=(Block, Disjunct))),
+    }
+
+
+def _get_size_info(size: Dict[str, int], stage: str) -> dict:
+    return {f"preprocessing_{quantity}_{stage}": number for quantity, number in size.items()}
+
+
+def apply_preprocessing(pyomo_model: ConcreteModel, steps: Sequence[str]) -> Tuple[ConcreteModel, dict]:
+    """
+    Applies the preprocessing steps to the model, or loads the preprocessed model from the run model cache.
+
+    Returns the preprocessed model and preprocessing information for the job result.
+    """
+    unknown_steps = [step for step in steps if step not in preprocessing_steps]
+    assert not unknown_steps, f"Unknown preprocessing steps: {', '.join(unknown_steps)}."
+    preprocessing_info = {'preprocessing_cached': False, **_get_size_info(get_model_size(pyomo_model), "before")}
+    cache_key = None
+    if 'model_name' in current_job:
+        # Record the preprocessing so that later caches of the model (e.g. GDP reformulations) are keyed correctly.
+        current_job.model_processing = list(current_job.get('model_processing', ())) + ["pre-" + "-".join(steps)]
+        cache_key = get_model_cache_key(current_job.model_name, *current_job.model_processing)
+        cached_model, cache_metadata = load_cached_model(cache_key)
+        if cached_model is not None:
+            preprocessing_info['preprocessing_cached'] = True
+            preprocessing_info['preprocessing_time'] = cache_metadata['preprocessing_time']
+            preprocessing_info['preprocessing_cache_load_time'] = cache_metadata['cache_load_time']
+            preprocessing_info.update(_get_size_info(get_model_size(cached_model), "after"))
+            return cached_model, preprocessing_info
+    preprocessing_start_time = monotonic()
+    for step in steps:
+        preprocessing_steps[step](pyomo_model)
+    preprocessing_info['preprocessing_time'] = monotonic() - preprocessing_start_time
+    preprocessing_info.update(_get_size_info(get_model_size(pyomo_model), "after"))
+    if cache_key is not None:
+        cache_model(pyomo_model, cache_key, preprocessing_time=preprocessing_info['preprocessing_time'])
+    return pyomo_model, preprocessing_info
+
@@ -6,18 +6,171 @@ At the end of the job, it dumps results to the 'pysperf_results.log' file.
 
 At various points in the execution, empty breadcrumb files are generated to indicate progression and status.
 These file names are documented in the central configuration file 'config.py'.
+
+If the run has preprocessing steps, they are applied to the built model before it is solved.
+If the job is repeated, the model is rebuilt and solved once per attempt, optionally with a permuted constraint order.
+All attempts are recorded under 'attempts', and the result of the attempt with the median solver time is
+recorded at the top level of the result file.
+
+If enabled in the options, kernel resource limits are applied to the runner process before the model is built.
+These are inherited by the solver subprocesses, each of which gets the full limits. If a limit is hit, the result
+file records the limit type under 'resource_limit' and the solve done breadcrumb is not generated.
 """
+import random
+import resource
+import signal
 from pathlib import Path
+from typing import List, Optional
 
 import yaml
+from pyomo.common.modeling import unique_component_name
+from pyomo.environ import Block, ConcreteModel, Constraint, ConstraintList
+from pyomo.gdp import Disjunct
 
 from pysperf.config import (
-    runner_config_filename, job_model_built_filename, job_result_filename, job_solve_done_filename,
-    job_start_filename, job_stop_filename, )
+    current_job, get_solver_thread_count, runner_config_filename, job_model_built_filename, job_result_filename,
+    job_solve_done_filename, job_start_filename, job_stop_filename, )
 from pysperf import get_formatted_time_now, options
 from pysperf.base_classes import _JobResult
 
 
+# GAMS solver status codes of a failed solver (solver failure, internal solver error, system failure),
+# e.g. a solver subprocess ended by a resource limit
+_gams_solver_failure_statuses = {10, 11, 13}
+# Peak resident memory of the solver subprocesses, as a fraction of the memory limit, from which a failure is
+# attributed to the memory limit. The limit is on the address space, which exceeds the resident memory.
+_child_memory_limit_fraction = 0.8
+
+
+class _ResourceLimitExceeded(Exception):
+    pass
+
+
+def _raise_cpu_limit_exceeded(signum, frame):
+    raise _ResourceLimitExceeded('cpu_limit')
+
+
+def _apply_resource_limits(memory: float, cpu_time_limit: Optional[float]) -> None:
+    """
+    Applies address space and CPU time limits to this process and its future children.
+
+    The limits apply to each process separately: a solver subprocess gets the full limits, rather than a share
+    of them with the runner and the other subprocesses. The CPU time already used by this process
+    (e.g. by the host calibration) is added to its CPU time limit.
+
+    The job is not pinned to cores: jobs do not know which cores the other jobs on the node use, so pinning
+    would put them all on the same cores.
+    """
+    memory_bytes = int(memory * 1024 ** 3)
+    resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+    if cpu_time_limit:
+        # SIGXCPU is sent at the soft limit. The hard limit (SIGKILL) leaves time to record the result.
+        self_usage = resource.getrusage(resource.RUSAGE_SELF)
+        soft_cpu_limit = int(cpu_time_limit + self_usage.ru_utime + self_usage.ru_stime)
+        hard_cpu_limit = soft_cpu_limit + int(options["job time limit minimum buffer"])
+        signal.signal(signal.SIGXCPU, _raise_cpu_limit_exceeded)
+        resource.setrlimit(resource.RLIMIT_CPU, (soft_cpu_limit, hard_cpu_limit))
+
+
+def _get_children_cpu_time() -> float:
+    children_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return children_usage.ru_utime + children_usage.ru_stime
+
+
+def _classify_children_resource_usage(memory: float, cpu_time_limit: Optional[float],
+                                      children_cpu_time_at_start: float) -> Optional[str]:
+    """
+    Returns 'memory_limit' or 'cpu_limit' if the finished solver subprocesses reached an applied resource limit.
+
+    Solver interfaces such as GAMS do not report how a solver subprocess ended, so its resource usage is compared
+    to the limits instead. The kernel only reports the total CPU time of the subprocesses since the start of
+    the solve, and the peak resident memory of the largest one.
+    """
+    children_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    children_cpu_time = children_usage.ru_utime + children_usage.ru_stime - children_cpu_time_at_start
+    if cpu_time_limit and children_cpu_time >= cpu_time_limit:
+        return 'cpu_limit'
+    # The peak resident memory is reported in kB on Linux
+    if children_usage.ru_maxrss * 1024 >= _child_memory_limit_fraction * memory * 1024 ** 3:
+        return 'memory_limit'
+    return None
+
+
+def _classify_resource_failure(err: BaseException, memory: float, cpu_time_limit: Optional[float],
+                               children_cpu_time_at_start: float) -> Optional[str]:
+    """
+    Returns 'memory_limit' or 'cpu_limit' if the error was caused by an applied resource limit.
+
+    The direct evidence is SIGXCPU in this process, a MemoryError, or a solver subprocess ended by SIGXCPU
+    (soft CPU time limit) or SIGKILL (hard CPU time limit), as reported by the error return code.
+    Otherwise, the resource usage of the solver subprocesses is compared to the limits.
+    """
+    for cause in (err, err.__cause__, err.__context__):
+        if isinstance(cause, _ResourceLimitExceeded):
+            return str(cause)
+        if isinstance(cause, MemoryError):
+            return 'memory_limit'
+        returncode = getattr(cause, 'returncode', None)
+        if cpu_time_limit and isinstance(returncode, int) and -returncode in (signal.SIGXCPU, signal.SIGKILL):
+            return 'cpu_limit'
+    return _classify_children_resource_usage(memory, cpu_time_limit, children_cpu_time_at_start)
+
+
+def _stringify_statuses(job_result: _JobResult) -> None:
+    if 'termination_condition' in job_result:
+        job_result.termination_condition = str(job_result.termination_condition)
+    if 'pyomo_solver_status' in job_result:
+        job_result.pyomo_solver_status = str(job_result.pyomo_solver_status)
+
+
+def _job_result_to_dict(job_result: _JobResult) -> dict:
+    result = dict(**job_result)
+    if 'racers' in job_result:
+        # Portfolio solver results hold a container of racer results
+        result['racers'] = {racer_name: dict(**racer_info) for racer_name, racer_info in job_result.racers.items()}
+    return result
+
+
+def _write_job_result(job_result: _JobResult) -> None:
+    with open(job_result_filename, 'w') as result_file:
+        _stringify_statuses(job_result)
+        result_to_store = _job_result_to_dict(job_result)
+        if 'attempts' in job_result:
+            for attempt in job_result.attempts:
+                _stringify_statuses(attempt)
+            result_to_store['attempts'] = [_job_result_to_dict(attempt) for attempt in job_result.attempts]
+        yaml.safe_dump(result_to_store, result_file)
+
+
+def _permute_constraint_order(pyomo_model: ConcreteModel, seed: int) -> None:
+    """
+    Shuffles the order of the active constraints within each block and disjunct of the model.
+
+    The constraints are deactivated and re-declared in a random order on a new constraint list of the same block.
+    The model writers also derive the variable order from the constraint order.
+    """
+    rng = random.Random(seed)
+    blocks = [pyomo_model] + list(pyomo_model.component_data_objects(
+        ctype=(Block, Disjunct), active=True, descend_into=(Block, Disjunct)))
+    for block in blocks:
+        constraints = list(block.component_data_objects(Constraint, active=True, descend_into=False))
+        if len(constraints) < 2:
+            continue
+        rng.shuffle(constraints)
+        permuted_constraints = ConstraintList()
+        block.add_component(unique_component_name(block, "_pysperf_permuted_constraints"), permuted_constraints)
+        for constraint in constraints:
+            constraint.deactivate()
+            permuted_constraints.add(constraint.expr)
+
+
+def _get_median_attempt(attempts: List[_JobResult]) -> _JobResult:
+    """Returns the attempt with the median solver run time (the lower median for an even number of attempts)."""
+    sorted_attempts = sorted(attempts, key=lambda attempt: (
+        attempt.solver_run_time if attempt.get('solver_run_time', None) is not None else float('inf')))
+    return sorted_attempts[(len(sorted_attempts) - 1) // 2]
+
+
 def run_test_case():
     # Load test job configuration
     with open(runner_config_filename) as file:
@@ -27,31 +180,101 @@ def run_test_case():
         # Time limit must be updated before solver library import.
         time_limit = runner_options["time_limit"]
         options.time_limit = time_limit
+        memory = runner_options.get("memory", options.memory)
+        processes = runner_options.get("processes", options.processes)
+        cpu_time_limit = runner_options.get("cpu time limit", None)
+        repeats = runner_options.get("repeats", 1)
+        permute_model_order = runner_options.get("permute model order", False)
+        preprocessing = runner_options.get("preprocessing", [])
+        racers = runner_options.get("racers", None)
+        solver_variant = runner_options.get("solver variant", None)
+        # The solver thread count follows the processor limit, which is shared by the racers of a portfolio.
+        options.processes = max(1, processes // len(racers)) if racers else processes
+    # Calibrate the host speed. This must also happen before solver library import,
+    # and before the resource limits, which do not count the CPU time spent so far.
+    from pysperf.calibration import get_host_calibration, get_time_normalization_factor
+    calibration = get_host_calibration()
+    if options.get("scale time limit to machine speed", False):
+        normalization_factor = get_time_normalization_factor(calibration.calibration_time)
+        if normalization_factor:
+            options.time_limit = time_limit / normalization_factor
+    apply_resource_limits = options.get("apply resource limits", False)
+    if apply_resource_limits:
+        _apply_resource_limits(memory, cpu_time_limit)
     # Get model and solver objects
     from pysperf.model_library import models
     from pysperf.solver_library import solvers
+    if racers:
+        from pysperf.racing import register_portfolio_solver
+        register_portfolio_solver(racers)
+    if solver_variant:
+        from pysperf.solver_library_tools import register_solver_variant
+        register_solver_variant(solver_variant['base solver'], solver_variant['parameters'])
     test_model = models[model_name]
     test_solver = solvers[solver_name]
+    current_job.model_name = model_name
+    current_job.solver_name = solver_name
+    current_job.run_dir = Path.cwd().resolve().parents[1]  # Job directories are <run dir>/<solver>/<model>
     job_result = _JobResult()
-    # Build the model
-    job_result.model_build_start_time = get_formatted_time_now()
-    pyomo_model = test_model.build_function()
-    job_result.model_build_end_time = get_formatted_time_now()
-    Path(job_model_built_filename).touch()
-    # Run the solver
-    job_result.solver_start_time = get_formatted_time_now()
-    solve_result = test_solver.solve_function(pyomo_model)
-    job_result.solver_end_time = get_formatted_time_now()
+    job_result.solver_threads = get_solver_thread_count()
+    job_result.hostname = calibration.hostname
+    job_result.cpu_model = calibration.cpu_model
+    job_result.calibration_time = calibration.calibration_time
+    job_result.time_limit = options.time_limit
+    attempts = []
+    children_cpu_time_at_start = _get_children_cpu_time()
+    try:
+        for attempt_num in range(repeats):
+            attempt_result = _JobResult()
+            current_job.model_processing = []
+            # Build the model
+            attempt_result.model_build_start_time = get_formatted_time_now()
+            pyomo_model = test_model.build_function()
+            attempt_result.model_build_end_time = get_formatted_time_now()
+            if permute_model_order and attempt_num > 0:
+                _permute_constraint_order(pyomo_model, seed=attempt_num)
+                attempt_result.permutation_seed = attempt_num
+                # Permuted models must not share cached processed models with the original
+                current_job.model_processing.append(f"permuted{attempt_num}")
+            Path(job_model_built_filename).touch()
+            if preprocessing:
+                from pysperf.preprocessing import apply_preprocessing
+                attempt_result.preprocessing_start_time = get_formatted_time_now()
+                pyomo_model, preprocessing_info = apply_preprocessing(pyomo_model, preprocessing)
+                attempt_result.preprocessing_end_time = get_formatted_time_now()
+                attempt_result.update(preprocessing_info)
+            # Run the solver
+            attempt_result.solver_start_time = get_formatted_time_now()
+            children_cpu_time_at_start = _get_children_cpu_time()
+            solve_result = test_solver.solve_function(pyomo_model)
+            attempt_result.solver_end_time = get_formatted_time_now()
+            if apply_resource_limits and solve_result.get('gams_solver_status') in _gams_solver_failure_statuses:
+                # GAMS reports a solver subprocess ended by a resource limit as a solver failure
+                resource_limit = _classify_children_resource_usage(memory, cpu_time_limit, children_cpu_time_at_start)
+                if resource_limit is not None:
+                    raise _ResourceLimitExceeded(resource_limit)
+            attempt_result.update(solve_result)
+            attempts.append(attempt_result)
+            del pyomo_model
+    except Exception as err:
+        if not apply_resource_limits:
+            raise
+        resource_limit = _classify_resource_failure(err, memory, cpu_time_limit, children_cpu_time_at_start)
+        if resource_limit is None:
+            raise
+        job_result.resource_limit = resource_limit
+        job_result.termination_condition = 'resourceInterrupt'
+        if repeats > 1:
+            job_result.attempts = attempts
+        _write_job_result(job_result)
+        raise
     Path(job_solve_done_filename).touch()
     # Update results object
-    job_result.update(solve_result)
+    job_result.update(_get_median_attempt(attempts))
+    if repeats > 1:
+        job_result.attempts = attempts
     # Write result to file
-    with open(job_result_filename, 'w') as result_file:
-        if 'termination_condition' in job_result:
-            job_result.termination_condition = str(job_result.termination_condition)
-        if 'pyomo_solver_status' in job_result:
-            job_result.pyomo_solver_status = str(job_result.pyomo_solver_status)
-        yaml.safe_dump(dict(**job_result), result_file)
+    _write_job_result(job_result)
 
 
 if __name__ == "__main__":
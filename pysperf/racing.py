@@ -0,0 +1,210 @@
+"""
+Solver portfolio racing.
+
+A portfolio solver races several library solvers on the same built model, each in a forked process.
+When a racer proves the relative optimality gap (or infeasibility) with a solver that is global for the model
+type, the remaining racers are stopped. The portfolio reports the best primal and dual bounds found,
+together with the winner and the result of every racer at the stopping time.
+Racers are stopped with an interrupt, so that solvers handling it return the bounds found so far: the result of
+a stopped racer records these bounds if it returned them within the stop grace time, and the time it stopped.
+
+Portfolio solvers are registered in the solver library as "Race+<solver>+<solver>...", so that their jobs
+are run and analyzed like those of any other solver.
+"""
+import os
+import signal
+import traceback
+from pathlib import Path
+from time import monotonic, sleep
+from typing import Dict, List, Optional
+
+import pyomo.environ as pyo
+import yaml
+
+from .base_classes import _JobResult
+from .config import current_job, models, options, solvers
+from .model_library import compute_model_stats
+from .solver_library_tools import register_solver
+
+portfolio_solver_prefix = "Race"
+_racer_result_filename = "race.{racer}.result.log"
+# Time (seconds) given to stopped racers to terminate before they are killed.
+_racer_stop_grace_time = 5
+# Fields of the racer results recorded in the portfolio job result
+_racer_result_fields = ('LB', 'UB', 'termination_condition', 'solver_run_time')
+
+
+def get_portfolio_solver_name(racer_names: List[str]) -> str:
+    return "+".join([portfolio_solver_prefix] + list(racer_names))
+
+
+def is_portfolio_solver(solver_name: str) -> bool:
+    return solvers[solver_name].get('racers', None) is not None
+
+
+def register_portfolio_solver(racer_names: List[str]) -> str:
+    """Registers the portfolio solver racing the given library solvers, if not yet registered, and returns its name."""
+    name = get_portfolio_solver_name(racer_names)
+    if name in solvers:
+        return name
+    for racer_name in racer_names:
+        if racer_name not in solvers:
+            raise ValueError(f"{racer_name} is not in the solver library.")
+        if is_portfolio_solver(racer_name):
+            raise ValueError(f"Portfolio solver {racer_name} cannot be raced.")
+    racers = [solvers[racer_name] for racer_name in racer_names]
+    register_solver(
+        name=name,
+        solve_function=lambda pyomo_model: _race_solvers(list(racer_names), pyomo_model),
+        compatible_model_types=set.intersection(*(set(racer.compatible_model_types) for racer in racers)),
+        global_for_model_types=set.union(*(set(racer.global_for_model_types) for racer in racers)),
+    )
+    solvers[name].racers = list(racer_names)
+    return name
+
+
+def _stringify_statuses(result: dict) -> dict:
+    return {key: str(value) if key in {'termination_condition', 'pyomo_solver_status'} else value
+            for key, value in result.items()}
+
+
+def _run_racer(racer_name: str, pyomo_model: pyo.ConcreteModel) -> None:
+    """Runs a racer in a forked child process, and writes its result file. Never returns."""
+    exit_code = 1
+    try:
+        # Lead a new process group, so that the racer can be stopped together with its solver subprocesses.
+        # Also set by the parent, as the racer may be stopped before it runs.
+        os.setpgid(0, 0)
+        # The solver subprocesses handle the interrupt that stops the race. The racer keeps waiting for their results.
+        signal.signal(signal.SIGINT, lambda signum, frame: None)
+        racer_result = solvers[racer_name].solve_function(pyomo_model)
+        with open(_racer_result_filename.format(racer=racer_name), 'w') as result_file:
+            yaml.safe_dump(_stringify_statuses(dict(**racer_result)), result_file)
+        exit_code = 0
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        os._exit(exit_code)
+
+
+def _read_racer_result(racer_name: str) -> Optional[dict]:
+    result_path = Path(_racer_result_filename.format(racer=racer_name))
+    if not result_path.exists():
+        return None
+    with result_path.open('r') as result_file:
+        return yaml.safe_load(result_file)
+
+
+def _proves_optimality(racer_name: str, racer_result: dict) -> bool:
+    """True if the racer is global for the model type and proved infeasibility or the relative optimality gap."""
+    test_model = models[current_job.model_name]
+    if test_model.model_type not in solvers[racer_name].global_for_model_types:
+        return False
+    if racer_result.get('termination_condition', None) == str(pyo.TerminationCondition.infeasible):
+        return True
+    lb, ub = racer_result.get('LB', None), racer_result.get('UB', None)
+    if lb is None or ub is None:
+        return False
+    return abs(ub - lb) <= options.optcr * max(abs(ub), abs(lb), 1E-10)
+
+
+def _stop_racers(racer_pids: Dict[int, str], race_start_time: float) -> Dict[str, dict]:
+    """
+    Interrupts the racers, and kills those still running after the grace time.
+
+    Returns the information of each stopped racer: the time it stopped, and the bounds it reported, if any.
+    """
+    stopped_racers_info = {racer_name: {'status': 'stopped'} for racer_name in racer_pids.values()}
+    for pid in racer_pids:
+        try:
+            os.killpg(pid, signal.SIGINT)
+        except ProcessLookupError:
+            pass
+    stop_deadline = monotonic() + _racer_stop_grace_time
+    while racer_pids and monotonic() < stop_deadline:
+        pid, _ = os.waitpid(-1, os.WNOHANG)
+        if pid == 0:
+            sleep(0.1)
+            continue
+        racer_name = racer_pids.pop(pid, None)
+        if racer_name is None:
+            continue
+        stopped_racers_info[racer_name]['stop_time'] = monotonic() - race_start_time
+        racer_result = _read_racer_result(racer_name)
+        if racer_result is not None:
+            stopped_racers_info[racer_name].update({key: racer_result.get(key, None) for key in _racer_result_fields})
+    for pid, racer_name in racer_pids.items():
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        os.waitpid(pid, 0)
+        stopped_racers_info[racer_name]['stop_time'] = monotonic() - race_start_time
+    return stopped_racers_info
+
+
+def _race_solvers(racer_names: List[str], pyomo_model: pyo.ConcreteModel) -> _JobResult:
+    # The model type decides which racers can prove optimality
+    compute_model_stats(only_models={current_job.model_name})
+    minimizing = next(pyomo_model.component_data_objects(pyo.Objective, active=True)).sense == pyo.minimize
+    race_start_time = monotonic()
+    racer_pids = {}
+    for racer_name in racer_names:
+        Path(_racer_result_filename.format(racer=racer_name)).unlink(missing_ok=True)  # from a previous attempt
+        pid = os.fork()
+        if pid == 0:
+            _run_racer(racer_name, pyomo_model)
+        try:
+            os.setpgid(pid, pid)
+        except ProcessLookupError:  # The racer has already exited
+            pass
+        racer_pids[pid] = racer_name
+
+    racers_info = {}
+    racer_results = {}
+    winner = None
+    while racer_pids:
+        pid, exit_status = os.waitpid(-1, 0)
+        racer_name = racer_pids.pop(pid, None)
+        if racer_name is None:
+            continue
+        racer_result = _read_racer_result(racer_name)
+        racers_info[racer_name] = {'status': 'finished' if racer_result is not None else 'failed',
+                                   'finish_time': monotonic() - race_start_time}
+        if racer_result is None:
+            continue
+        racer_results[racer_name] = racer_result
+        racers_info[racer_name].update({key: racer_result.get(key, None) for key in _racer_result_fields})
+        if _proves_optimality(racer_name, racer_result):
+            winner = racer_name
+            break
+    stopping_time = monotonic() - race_start_time
+    racers_info.update(_stop_racers(racer_pids, race_start_time))
+
+    job_result = _JobResult()
+    job_result.solver_run_time = stopping_time
+    job_result.race_winner = winner
+    # In the order of the racers
+    job_result.racers = {racer_name: racers_info[racer_name] for racer_name in racer_names}
+    # The best primal bound of any racer, and the best dual bound of the racers global for the model type.
+    primal_key, dual_key = ('UB', 'LB') if minimizing else ('LB', 'UB')
+    best_primal = min if minimizing else max
+    primal_bounds = {name: result[primal_key] for name, result in racer_results.items()
+                     if result.get(primal_key, None) is not None}
+    global_racers = {name for name in racer_results
+                     if models[current_job.model_name].model_type in solvers[name].global_for_model_types}
+    dual_bounds = [racer_results[name][dual_key] for name in global_racers
+                   if racer_results[name].get(dual_key, None) is not None]
+    best_racer = winner
+    if best_racer is None and primal_bounds:
+        best_racer = best_primal(primal_bounds, key=primal_bounds.get)
+    if best_racer is not None:
+        best_result = racer_results[best_racer]
+        job_result[primal_key] = best_primal(primal_bounds.values()) if primal_bounds else None
+        job_result[dual_key] = ((max if minimizing else min)(dual_bounds) if dual_bounds
+                                else best_result.get(dual_key, None))
+        job_result.termination_condition = best_result.get('termination_condition', None)
+        job_result.pyomo_solver_status = best_result.get('pyomo_solver_status', None)
+    else:
+        job_result.termination_condition = str(pyo.TerminationCondition.unknown)
+    return job_result
@@ -9,10 +9,14 @@ import yaml
 from pyutilib.misc import Container
 
 from .model_types import ModelType
+from .preprocessing import preprocessing_steps
+from .racing import is_portfolio_solver, register_portfolio_solver
+from .solver_library_tools import register_solver_variant
 from pysperf.model_library import models, requires_model_stats
 from pysperf.solver_library import solvers
 from .config import (
-    cache_internal_options_to_file, get_formatted_time_now, options, run_config_filename, runner_filepath, runsdir, )
+    cache_internal_options_to_file, get_formatted_time_now, get_solver_thread_count, options, run_config_filename,
+    runner_filepath, runsdir, )
 
 this_run_config = Container()
 
@@ -23,22 +27,43 @@ def _write_run_config(this_run_dir: Path):
         config_to_store.jobs_failed = [(model, solver) for model, solver in config_to_store.jobs_failed]
     if 'jobs_run' in config_to_store:
         config_to_store.jobs_run = [(model, solver) for model, solver in config_to_store.jobs_run]
+    if 'jobs_pruned' in config_to_store:
+        config_to_store.jobs_pruned = [(model, solver) for model, solver in config_to_store.jobs_pruned]
+    if 'portfolio_solvers' in config_to_store:
+        config_to_store.portfolio_solvers = dict(**config_to_store.portfolio_solvers)
+    if 'solver_variants' in config_to_store:
+        config_to_store.solver_variants = {
+            solver_name: _get_solver_variant_info(variant_info['base solver'], variant_info['parameters'])
+            for solver_name, variant_info in config_to_store.solver_variants.items()}
     with this_run_dir.joinpath(run_config_filename).open('w') as runinfofile:
         yaml.safe_dump(dict(**config_to_store), runinfofile)
 
 
+def _get_solver_variant_info(base_solver: str, parameters: dict) -> dict:
+    return {'base solver': base_solver, 'parameters': dict(**parameters)}
+
+
 def _load_run_config(this_run_dir: Optional[Path] = None):
     if not this_run_dir:
         this_run_dir = get_run_dir()
     with this_run_dir.joinpath(run_config_filename).open('r') as runinfofile:
         _run_options = yaml.safe_load(runinfofile)
+    # Clear the configuration of any previously loaded run, as runs do not all have the same keys
+    this_run_config.clear()
     this_run_config.update(_run_options)
     # Convert things from list back to tuple
     this_run_config.jobs = [(model, solver) for model, solver in this_run_config.jobs]
+    this_run_config.jobs_to_run = [(model, solver) for model, solver in this_run_config.jobs_to_run]
+    for racer_names in this_run_config.get('portfolio_solvers', {}).values():
+        register_portfolio_solver(racer_names)
+    for variant_info in this_run_config.get('solver_variants', {}).values():
+        register_solver_variant(variant_info['base solver'], dict(**variant_info['parameters']))
     if 'jobs_failed' in this_run_config:
         this_run_config.jobs_failed = set((model, solver) for model, solver in this_run_config.jobs_failed)
     if 'jobs_run' in this_run_config:
         this_run_config.jobs_run = set((model, solver) for model, solver in this_run_config.jobs_run)
+    if 'jobs_pruned' in this_run_config:
+        this_run_config.jobs_pruned = set((model, solver) for model, solver in this_run_config.jobs_pruned)
 
 
 @requires_model_stats
@@ -50,6 +75,8 @@ def setup_new_matrix_run(model_set: Set[str] = (),
         assert model_name in models, f"{model_name} is not in the model library."
     for solver_name in solver_set:
         assert solver_name in solvers, f"{solver_name} is not in the solver library."
+    for step in options.preprocessing or []:
+        assert step in preprocessing_steps, f"{step} is not a preprocessing step."
     valid_model_names = model_set if model_set else models.keys()
     valid_solver_names = solver_set if solver_set else solvers.keys()
     valid_model_types = {ModelType[mtype] for mtype in model_type_set} if model_type_set else ModelType
@@ -68,6 +95,15 @@ def setup_new_matrix_run(model_set: Set[str] = (),
     this_run_config.jobs = jobs
     this_run_config.jobs_to_run = jobs  # This will be different for re-runs
     this_run_config.time_limit = options.time_limit
+    this_run_config.repeats = options.repeats
+    this_run_config.preprocessing = list(options.preprocessing or [])
+    this_run_config.portfolio_solvers = {
+        solver_name: solvers[solver_name].racers for solver_name in {solver_name for _, solver_name in jobs}
+        if is_portfolio_solver(solver_name)}
+    this_run_config.solver_variants = {
+        solver_name: _get_solver_variant_info(solvers[solver_name].base_solver, solvers[solver_name].parameters)
+        for solver_name in {solver_name for _, solver_name in jobs}
+        if solvers[solver_name].get('base_solver', None) is not None}
     # TODO check that other options don't need to be cached here
     # create directories and files
     this_run_dir = _make_new_run_dir()
@@ -76,6 +112,7 @@ def setup_new_matrix_run(model_set: Set[str] = (),
     for model_name, solver_name in jobs:
         single_job_dir = this_run_dir.joinpath(solver_name, model_name)
         single_job_dir.mkdir(parents=True, exist_ok=False)
+        job_processes = get_job_processes(solver_name)
         # build execution script
         # Note: this passes unused arguments to the pysperf_runner script, but these show up when
         # other users on the machine look at the running scripts, so it is primarily a service to them.
@@ -83,10 +120,13 @@ def setup_new_matrix_run(model_set: Set[str] = (),
                        f'"{solver_name}" "{model_name}" "{options.time_limit}s" '
                        f'> >(tee -a stdout.log) 2> >(tee -a stderr.log >&2)')
         separation_line = "-" * 60
+        solver_threads = get_solver_thread_count()
         execute_script = f"""\
         #!/bin/bash
         
         cd {single_job_dir.resolve()}
+        export OMP_NUM_THREADS={solver_threads}
+        export MKL_NUM_THREADS={solver_threads}
         echo "{separation_line}" >> stdout.log
         echo "Pysperf execution at $(date)" >> stdout.log
         echo "{separation_line}" >> stdout.log
@@ -105,6 +145,14 @@ def setup_new_matrix_run(model_set: Set[str] = (),
             "model name": model_name,
             "solver name": solver_name,
             "time_limit": options.time_limit,
+            "memory": options.memory,
+            "processes": job_processes,
+            "cpu time limit": get_time_limit_with_buffer(models[model_name].build_time) * job_processes,
+            "repeats": options.repeats,
+            "permute model order": options["permute model order"],
+            "preprocessing": this_run_config.preprocessing,
+            "racers": solvers[solver_name].get('racers', None),
+            "solver variant": this_run_config.solver_variants.get(solver_name, None),
         }
         with single_job_config_path.open('w') as single_job_config_file:
             yaml.safe_dump(single_job_config, single_job_config_file)
@@ -136,6 +184,8 @@ def setup_redo_matrix_run(run_number: Optional[int] = None,
     this_run_dir = get_run_dir(run_number)
     _load_run_config(this_run_dir)
     options.time_limit = this_run_config.time_limit
+    options.repeats = this_run_config.get("repeats", 1)
+    options.preprocessing = this_run_config.get("preprocessing", [])
     print(f"Re-executing pysperf run{options['current run number']} in directory '{this_run_dir}'.")
 
     existing_jobs_to_skip = set() if redo_existing else this_run_config.jobs_run
@@ -149,6 +199,9 @@ def setup_redo_matrix_run(run_number: Optional[int] = None,
         and model_name in valid_model_names
         and solver_name in valid_solver_names
     ]
+    if 'jobs_pruned' in this_run_config:
+        # Pruned jobs that are executed again are no longer pruned
+        this_run_config.jobs_pruned -= set(this_run_config.jobs_to_run)
 
     # Submit jobs for execution
     cache_internal_options_to_file()
@@ -184,10 +237,17 @@ def get_run_dir(run_number: Optional[int] = None) -> Path:
     return runsdir.joinpath(f"run{run_number}")
 
 
+def get_job_processes(solver_name: str) -> int:
+    """Processor limit of a job. Portfolio solver jobs run each racer with the processor limit."""
+    return options.processes * len(solvers[solver_name].get('racers', None) or [solver_name])
+
+
 def get_time_limit_with_buffer(model_build_time: Optional[int] = 0) -> int:
     time_limit = options.time_limit
     buffer_percent = options["job time limit percent buffer"]
     min_buffer = options["job time limit minimum buffer"]
     time_limit += model_build_time
+    # Repeated jobs build and solve the model once per attempt
+    time_limit *= options.get("repeats", 1)
     time_limit += max(min_buffer, time_limit * buffer_percent / 100)
     return int(ceil(time_limit))
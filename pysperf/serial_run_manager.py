@@ -1,10 +1,14 @@
 """Runs test jobs in serial."""
 import subprocess
+from pathlib import Path
+from time import monotonic
+from typing import List, Optional, Tuple
 
 import yaml
 from .config import run_config_filename
 
 from pysperf import options
+from pysperf.calibration import get_host_calibration
 from pysperf.model_library import models, requires_model_stats
 from .run_manager import _load_run_config, get_run_dir, get_time_limit_with_buffer, this_run_config
 
@@ -15,8 +19,23 @@ def execute_run():
     # Start executing the *.sh files
     this_run_dir = get_run_dir()
     _load_run_config(this_run_dir)
-    jobs = this_run_config.jobs_to_run
+    execute_jobs(this_run_dir, this_run_config.jobs_to_run)
+
+
+def execute_jobs(this_run_dir: Path, jobs: List[Tuple[str, str]],
+                 time_budget: Optional[float] = None) -> List[Tuple[str, str]]:
+    """
+    Executes the job scripts of the given jobs of a run, one after the other.
+
+    No further jobs are started once the time budget (seconds) is spent. Returns the executed jobs.
+    """
+    # Calibrate this host now, rather than within the time limit of its first job
+    get_host_calibration()
+    start_time = monotonic()
+    jobs_executed = []
     for jobnum, (model_name, solver_name) in enumerate(jobs, start=1):
+        if time_budget is not None and monotonic() - start_time >= time_budget:
+            break
         current_run_num = options["current run number"]
         print(f"Executing run {current_run_num}-{jobnum}/{len(jobs)}: Solver {solver_name} with model {model_name}.")
         runner_script = this_run_dir.joinpath(solver_name, model_name, "run_job.sh")
@@ -28,3 +47,5 @@ def execute_run():
             )
         except subprocess.TimeoutExpired:
             pass
+        jobs_executed.append((model_name, solver_name))
+    return jobs_executed
@@ -1,13 +1,19 @@
 import textwrap
-from functools import partial
-from typing import Callable, Optional, Set
+from collections import defaultdict
+from functools import partial, wraps
+from itertools import product
+from time import monotonic
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
 
 import pandas
 
 from .base_classes import _JobResult, _TestSolver
-from .config import _solver_info_log_path, solvers, get_formatted_time_now
+from .config import _solver_info_log_path, current_job, get_formatted_time_now, options, solvers
+from .model_cache import cache_model, get_model_cache_key, load_cached_model
 from .model_types import ModelType
+from .tight_bigm import apply_tight_bigm
 from pyomo.environ import TransformationFactory, ConcreteModel
+from pyomo.solvers.plugins.solvers.persistent_solver import PersistentSolver
 
 # Maps registered solver functions to their names in the library
 # when decorator is used.
@@ -18,7 +24,14 @@ def register_solver(
         name: str, solve_function: Callable[[ConcreteModel], _JobResult],
         milp: Optional[str] = None, nlp: Optional[str] = None,
         compatible_model_types: Optional[Set[ModelType]] = None,
-        global_for_model_types: Optional[Set[ModelType]] = None) -> None:
+        global_for_model_types: Optional[Set[ModelType]] = None,
+        parameter_grid: Optional[Dict[str, Sequence[Any]]] = None) -> None:
+    """
+    Registers a solver in the solver library.
+
+    The parameter grid lists the values of the keyword parameters of the solve function
+    that may be tuned. Each combination is a solver variant (see register_solver_variants).
+    """
     if name in solvers:
         raise AttributeError(f"{name} already exists in the solver registry.")
     new_solver = _TestSolver()
@@ -28,6 +41,7 @@ def register_solver(
     new_solver.nlp = nlp
     new_solver.compatible_model_types = compatible_model_types if compatible_model_types else set()
     new_solver.global_for_model_types = global_for_model_types if global_for_model_types else set()
+    new_solver.parameter_grid = dict(parameter_grid) if parameter_grid else {}
     solvers[name] = new_solver
 
 
@@ -35,11 +49,12 @@ def register_solve_function(
         name: Optional[str] = None,
         milp: Optional[str] = None, nlp: Optional[str] = None,
         compatible_model_types: Optional[Set[ModelType]] = None,
-        global_for_model_types: Optional[Set[ModelType]] = None) -> Callable:
+        global_for_model_types: Optional[Set[ModelType]] = None,
+        parameter_grid: Optional[Dict[str, Sequence[Any]]] = None) -> Callable:
     def anon_decorator(solve_function):
         register_solver(solve_function.__name__, solve_function,
                         milp, nlp,
-                        compatible_model_types, global_for_model_types)
+                        compatible_model_types, global_for_model_types, parameter_grid)
         # Necessary to pass information to the register_GDP_reformulations decorator
         _name_map[solve_function] = solve_function.__name__
         return solve_function
@@ -47,7 +62,7 @@ def register_solve_function(
     def named_decorator(solve_function):
         register_solver(name, solve_function,
                         milp, nlp,
-                        compatible_model_types, global_for_model_types)
+                        compatible_model_types, global_for_model_types, parameter_grid)
         # Necessary to pass information to the register_GDP_reformulations decorator
         _name_map[solve_function] = name
         return solve_function
@@ -58,6 +73,51 @@ def register_solve_function(
         return named_decorator
 
 
+def get_solver_variant_name(base_solver_name: str, parameters: Dict[str, Any]) -> str:
+    return base_solver_name + "_" + ",".join(f"{key}={value}" for key, value in sorted(parameters.items()))
+
+
+def register_solver_variant(base_solver_name: str, parameters: Dict[str, Any]) -> str:
+    """
+    Registers the variant of a library solver that calls its solve function with the given keyword parameters,
+    if not yet registered, and returns its name.
+    """
+    name = get_solver_variant_name(base_solver_name, parameters)
+    if name in solvers:
+        return name
+    base_solver = solvers[base_solver_name]
+    if base_solver is None:
+        raise ValueError(f"{base_solver_name} is not in the solver library.")
+    register_solver(
+        name=name,
+        solve_function=partial(base_solver.solve_function, **parameters),
+        milp=base_solver.milp,
+        nlp=base_solver.nlp,
+        compatible_model_types=base_solver.compatible_model_types,
+        global_for_model_types=base_solver.global_for_model_types,
+    )
+    solvers[name].base_solver = base_solver_name
+    solvers[name].parameters = dict(parameters)
+    return name
+
+
+def register_solver_variants(base_solver_name: str,
+                             parameter_grid: Optional[Dict[str, Sequence[Any]]] = None) -> List[str]:
+    """
+    Expands a parameter grid, by default the one registered with the solver, into solver variants.
+
+    Returns the names of the variants, one per combination of the parameter values.
+    """
+    if parameter_grid is None:
+        parameter_grid = solvers[base_solver_name].parameter_grid
+    if not parameter_grid:
+        return [base_solver_name]
+    parameter_names = sorted(parameter_grid)
+    return [
+        register_solver_variant(base_solver_name, dict(zip(parameter_names, parameter_values)))
+        for parameter_values in product(*(parameter_grid[parameter_name] for parameter_name in parameter_names))]
+
+
 def register_GDP_reformulations(mip_solve_function):
     gdp_transformation_methods = {
         'BM': TransformationFactory('gdp.bigm'),
@@ -74,12 +134,13 @@ def register_GDP_reformulations(mip_solve_function):
     gdp_compatible_mtypes = {mip_to_gdp_map[mtype] for mtype in base_solver.compatible_model_types}
     gdp_global_mtypes = {mip_to_gdp_map[mtype] for mtype in base_solver.global_for_model_types}
 
-    def get_solve_function_with_xfrm(xfrm):
+    def get_solve_function_with_xfrm(xfrm_name, xfrm):
         def gdp_solve_function(pyomo_model: ConcreteModel) -> _JobResult:
             job_result = _JobResult()
             job_result.gdp_to_mip_xfrm_start_time = get_formatted_time_now()
-            xfrm.apply_to(pyomo_model)
+            pyomo_model, xfrm_info = _apply_GDP_reformulation(pyomo_model, xfrm_name, xfrm)
             job_result.gdp_to_mip_xfrm_end_time = get_formatted_time_now()
+            job_result.update(xfrm_info)
             mip_job_result = mip_solve_function(pyomo_model)
             job_result.update(mip_job_result)
             return job_result
@@ -88,7 +149,7 @@ def register_GDP_reformulations(mip_solve_function):
     for xfrm_name, xfrm in gdp_transformation_methods.items():
         register_solver(
             name=base_solver.name + "-" + xfrm_name,
-            solve_function=get_solve_function_with_xfrm(xfrm),
+            solve_function=get_solve_function_with_xfrm(xfrm_name, xfrm),
             milp=base_solver.milp,
             nlp=base_solver.nlp,
             compatible_model_types=gdp_compatible_mtypes,
@@ -98,6 +159,108 @@ def register_GDP_reformulations(mip_solve_function):
     return mip_solve_function
 
 
+def _apply_GDP_reformulation(pyomo_model: ConcreteModel, xfrm_name: str, xfrm) -> Tuple[ConcreteModel, dict]:
+    """
+    Applies the GDP to MIP transformation, or loads the transformed model from the run model cache.
+
+    The transformation result depends only on the model and its BigM suffix, so it is shared by all solvers
+    using the same reformulation. Returns the transformed model and transformation information for the job result.
+
+    With the 'tight BigM' option, the Big-M reformulation uses tight Big-M values for each disjunct constraint
+    (see tight_bigm), where they are tighter than the Big-M value of the model.
+    """
+    xfrm_info = {'gdp_to_mip_xfrm_cached': False}
+    bm_suffix = pyomo_model.component("BigM")
+    bigM = bm_suffix.get(None, None) if bm_suffix is not None else None
+    tight_bigm = xfrm_name == 'BM' and options.get("tight BigM", False)
+    xfrm_processing = [xfrm_name, f"M{bigM}-tight" if tight_bigm else f"M{bigM}"]
+    if xfrm_name == 'BM':
+        xfrm_info['bigm_source'] = 'tight' if tight_bigm else 'model' if bigM is not None else 'estimated'
+    cache_key = None
+    if 'model_name' in current_job:
+        # Record the transformation so that later caches of the model (e.g. GAMS model files) are keyed correctly.
+        current_job.model_processing = list(current_job.get('model_processing', ())) + xfrm_processing
+        if options.get("cache GDP reformulations", False):
+            cache_key = get_model_cache_key(current_job.model_name, *current_job.model_processing)
+    if cache_key is not None:
+        cached_model, cache_metadata = load_cached_model(cache_key)
+        if cached_model is not None:
+            xfrm_info['gdp_to_mip_xfrm_cached'] = True
+            xfrm_info['gdp_to_mip_xfrm_time'] = cache_metadata['xfrm_time']
+            xfrm_info['gdp_to_mip_xfrm_cache_load_time'] = cache_metadata['cache_load_time']
+            return cached_model, xfrm_info
+    if tight_bigm:
+        xfrm_info.update(apply_tight_bigm(pyomo_model, current_job.get('model_name', pyomo_model.name)))
+    xfrm_start_time = monotonic()
+    xfrm.apply_to(pyomo_model)
+    xfrm_info['gdp_to_mip_xfrm_time'] = monotonic() - xfrm_start_time
+    if cache_key is not None:
+        cache_model(pyomo_model, cache_key, xfrm_time=xfrm_info['gdp_to_mip_xfrm_time'])
+    return pyomo_model, xfrm_info
+
+
+# Interface phases of Pyomo solvers, and the solver methods that implement them.
+_interface_phase_methods = {"write": "_presolve", "solve": "_apply_solver", "read": "_postsolve"}
+
+
+def time_pyomo_solve(pyomo_solver, pyomo_model: ConcreteModel, **solve_kwargs) -> Tuple[Any, Dict[str, float]]:
+    """
+    Solves the model with a Pyomo solver object, and times the phases of the solver interface.
+
+    The phases are: write (writing the model file, or translating the model for direct interfaces),
+    solve (launching and running the solver), read (reading the results back), and other (the remainder,
+    e.g. loading the solution into the model). Interfaces that do not implement the solve phases separately
+    (e.g. GAMS) only time the model file writing; the other phases are then included in 'other'.
+    Persistent interfaces are given the model with set_instance, which is timed as part of the write phase.
+
+    Returns the Pyomo results and the phase times, together with the total time.
+    """
+    phase_times = defaultdict(float)
+
+    def timed(phase, method):
+        @wraps(method)
+        def timed_method(*args, **kwargs):
+            phase_start_time = monotonic()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                phase_times[phase] += monotonic() - phase_start_time
+        return timed_method
+
+    phased_interface = all(hasattr(pyomo_solver, method) for method in _interface_phase_methods.values())
+    if phased_interface:
+        for phase, method in _interface_phase_methods.items():
+            setattr(pyomo_solver, method, timed(phase, getattr(pyomo_solver, method)))
+    else:
+        previous_write = pyomo_model.__dict__.get('write', None)  # e.g. the GAMS model file cache
+        pyomo_model.write = timed("write", pyomo_model.write)
+    start_time = monotonic()
+    try:
+        if isinstance(pyomo_solver, PersistentSolver):
+            timed("write", pyomo_solver.set_instance)(pyomo_model)
+        pyomo_results = pyomo_solver.solve(pyomo_model, **solve_kwargs)
+    finally:
+        total_time = monotonic() - start_time
+        if not phased_interface:
+            del pyomo_model.write
+            if previous_write is not None:
+                pyomo_model.write = previous_write
+    interface_times = {phase: phase_times[phase] if phased_interface or phase == "write" else None
+                       for phase in _interface_phase_methods}
+    interface_times["other"] = total_time - sum(phase_times.values())
+    interface_times["total"] = total_time
+    return pyomo_results, interface_times
+
+
+def get_reported_solver_time(pyomo_results) -> Optional[float]:
+    """Returns the time reported by the solver in the Pyomo results, or None if it did not report one."""
+    for time_attribute in ("wallclock_time", "time", "user_time"):
+        reported_time = getattr(pyomo_results.solver, time_attribute, None)
+        if isinstance(reported_time, (int, float)):
+            return float(reported_time)
+    return None
+
+
 def _get_solver_capability_marker(solver, model_type):
     if model_type in solver.global_for_model_types:
         return 'G'
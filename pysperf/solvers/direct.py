@@ -0,0 +1,135 @@
+"""
+Solvers called through Pyomo's own (non-GAMS) interfaces to locally installed open-source solvers.
+
+Each solver is registered only if its Pyomo interface and its executable or Python bindings are available.
+The job results record the time of each interface phase (see time_pyomo_solve), so that the interface overhead
+can be told apart from the time reported by the solver. The solver time is the time reported by the solver, or
+if it reports none, the time of the solve phase of the interface, or else the wall time of the whole solve.
+The 'solver_time_source' field of the job result records which one ('reported', 'interface', or 'wall').
+The multithreaded solvers get the same thread count as the GAMS solvers (GLPK, Ipopt, and SCIP run single-threaded).
+"""
+import shutil
+from importlib.util import find_spec
+from typing import Optional
+
+from pyomo.environ import ConcreteModel, SolverFactory
+
+from pysperf.base_classes import _JobResult
+from pysperf.config import get_solver_thread_count, options
+from pysperf.model_types import ModelType
+from pysperf.solver_library_tools import (
+    get_reported_solver_time, register_GDP_reformulations, register_solve_function, time_pyomo_solve, )
+
+
+def _interface_available(pyomo_solver_name: str, executable: Optional[str] = None,
+                         module: Optional[str] = None) -> bool:
+    # Checked without creating the solver, as Pyomo warns about every unavailable solver it creates.
+    if pyomo_solver_name not in SolverFactory:
+        return False
+    if executable is not None and shutil.which(executable) is None:
+        return False
+    if module is not None and find_spec(module) is None:
+        return False
+    return True
+
+
+def _solve_directly(pyomo_solver_name: str, pyomo_model: ConcreteModel, **solve_kwargs) -> _JobResult:
+    job_result = _JobResult()
+    pyomo_results, interface_times = time_pyomo_solve(
+        SolverFactory(pyomo_solver_name), pyomo_model, tee=True, **solve_kwargs)
+    reported_time = get_reported_solver_time(pyomo_results)
+    job_result.solver_reported_time = reported_time
+    job_result.update({f"interface_{phase}_time": phase_time for phase, phase_time in interface_times.items()})
+    if reported_time is not None:
+        job_result.interface_overhead_time = interface_times["total"] - reported_time
+    if reported_time is not None:
+        job_result.solver_run_time, job_result.solver_time_source = reported_time, 'reported'
+    elif interface_times["solve"] is not None:
+        job_result.solver_run_time, job_result.solver_time_source = interface_times["solve"], 'interface'
+    else:  # e.g. the appsi interfaces
+        job_result.solver_run_time, job_result.solver_time_source = interface_times["total"], 'wall'
+    job_result.pyomo_solver_status = pyomo_results.solver.status
+    job_result.termination_condition = pyomo_results.solver.termination_condition
+    job_result.LB = pyomo_results.problem.lower_bound
+    job_result.UB = pyomo_results.problem.upper_bound
+    return job_result
+
+
+if _interface_available('appsi_highs', module='highspy'):
+    @register_GDP_reformulations
+    @register_solve_function(
+        name="HiGHS-direct",
+        compatible_model_types={ModelType.MILP},
+        global_for_model_types={ModelType.MILP})
+    def HiGHS(pyomo_model):
+        return _solve_directly('appsi_highs', pyomo_model, timelimit=options.time_limit,
+                               options={'threads': get_solver_thread_count()})
+
+
+# Commercial MILP solvers through their persistent interfaces, which translate the model directly to the solver
+# without a model file, for the interface overhead comparison.
+if _interface_available('gurobi_persistent', module='gurobipy'):
+    @register_GDP_reformulations
+    @register_solve_function(
+        name="Gurobi-persistent",
+        compatible_model_types={ModelType.MILP},
+        global_for_model_types={ModelType.MILP})
+    def Gurobi_persistent(pyomo_model):
+        return _solve_directly('gurobi_persistent', pyomo_model, options={
+            'TimeLimit': options.time_limit, 'Threads': get_solver_thread_count()})
+
+
+if _interface_available('cplex_persistent', module='cplex'):
+    @register_GDP_reformulations
+    @register_solve_function(
+        name="CPLEX-persistent",
+        compatible_model_types={ModelType.MILP},
+        global_for_model_types={ModelType.MILP})
+    def CPLEX_persistent(pyomo_model):
+        return _solve_directly('cplex_persistent', pyomo_model, options={
+            'timelimit': options.time_limit, 'threads': get_solver_thread_count()})
+
+
+if _interface_available('cbc', executable='cbc'):
+    @register_GDP_reformulations
+    @register_solve_function(
+        name="CBC-direct",
+        compatible_model_types={ModelType.MILP},
+        global_for_model_types={ModelType.MILP})
+    def CBC(pyomo_model):
+        return _solve_directly('cbc', pyomo_model, timelimit=options.time_limit,
+                               options={'threads': get_solver_thread_count()})
+
+
+if _interface_available('glpk', executable='glpsol'):
+    @register_GDP_reformulations
+    @register_solve_function(
+        name="GLPK-direct",
+        compatible_model_types={ModelType.MILP},
+        global_for_model_types={ModelType.MILP})
+    def GLPK(pyomo_model):
+        return _solve_directly('glpk', pyomo_model, timelimit=options.time_limit)
+
+
+if _interface_available('ipopt', executable='ipopt'):
+    @register_solve_function(
+        name="Ipopt-direct",
+        compatible_model_types={ModelType.NLP, ModelType.cvxNLP},
+        global_for_model_types={ModelType.cvxNLP})
+    def Ipopt(pyomo_model):
+        return _solve_directly('ipopt', pyomo_model, options={'max_cpu_time': options.time_limit})
+
+
+# SCIP through its Python bindings if available, otherwise through its AMPL executable.
+_scip_interface = next((pyomo_solver_name for pyomo_solver_name, requirements in (
+    ('scip_direct', dict(module='pyscipopt')),
+    ('scip', dict(executable='scipampl')),
+) if _interface_available(pyomo_solver_name, **requirements)), None)
+if _scip_interface is not None:
+    @register_GDP_reformulations
+    @register_solve_function(
+        name="SCIP-direct",
+        compatible_model_types={ModelType.MINLP, ModelType.cvxMINLP, ModelType.MILP},
+        global_for_model_types={ModelType.MINLP, ModelType.cvxMINLP, ModelType.MILP})
+    def SCIP(pyomo_model):
+        return _solve_directly(_scip_interface, pyomo_model, options={'limits/time': options.time_limit})
@@ -2,6 +2,7 @@ from pyomo.environ import SolverFactory
 
 from pysperf.base_classes import _JobResult
 from pysperf.config import get_base_gams_options_list, options
+from pysperf.gams_tools import record_gams_statistics, reuse_gams_model_file
 from pysperf.model_types import ModelType
 from pysperf.solver_library_tools import register_GDP_reformulations, register_solve_function
 
@@ -12,25 +13,27 @@ from pysperf.solver_library_tools import register_GDP_reformulations, register_s
     global_for_model_types={ModelType.cvxMINLP, ModelType.MILP})
 def DICOPT(pyomo_model):
     job_result = _JobResult()
-    try:
-        pyomo_results = SolverFactory('gams').solve(
-            pyomo_model,
-            tee=True,
-            # keepfiles=True,
-            solver='dicopt',
-            add_options=get_base_gams_options_list() + [f'option reslim={options.time_limit};']
-        )
-    except ValueError as e:
-        # Handle GAMS interface complaining about using DICOPT for MIPs
-        if 'GAMS writer passed solver (dicopt) unsuitable for model type (mip)' in str(e):
+    with reuse_gams_model_file(pyomo_model, job_result), record_gams_statistics(job_result) as gams_output_files:
+        try:
             pyomo_results = SolverFactory('gams').solve(
                 pyomo_model,
                 tee=True,
-                solver='cplex',
+                **gams_output_files,
+                solver='dicopt',
                 add_options=get_base_gams_options_list() + [f'option reslim={options.time_limit};']
             )
-        else:
-            raise
+        except ValueError as e:
+            # Handle GAMS interface complaining about using DICOPT for MIPs
+            if 'GAMS writer passed solver (dicopt) unsuitable for model type (mip)' in str(e):
+                pyomo_results = SolverFactory('gams').solve(
+                    pyomo_model,
+                    tee=True,
+                    **gams_output_files,
+                    solver='cplex',
+                    add_options=get_base_gams_options_list() + [f'option reslim={options.time_limit};']
+                )
+            else:
+                raise
     job_result.solver_run_time = pyomo_results.solver.user_time
     job_result.pyomo_solver_status = pyomo_results.solver.status
     job_result.termination_condition = pyomo_results.solver.termination_condition
@@ -45,13 +48,14 @@ def DICOPT(pyomo_model):
     global_for_model_types={ModelType.MINLP, ModelType.cvxMINLP, ModelType.MILP})
 def BARON(pyomo_model):
     job_result = _JobResult()
-    pyomo_results = SolverFactory('gams').solve(
-        pyomo_model,
-        tee=True,
-        # keepfiles=True,
-        solver='baron',
-        add_options=get_base_gams_options_list() + [f'option reslim={options.time_limit};']
-    )
+    with reuse_gams_model_file(pyomo_model, job_result), record_gams_statistics(job_result) as gams_output_files:
+        pyomo_results = SolverFactory('gams').solve(
+            pyomo_model,
+            tee=True,
+            **gams_output_files,
+            solver='baron',
+            add_options=get_base_gams_options_list() + [f'option reslim={options.time_limit};']
+        )
     job_result.solver_run_time = pyomo_results.solver.user_time
     job_result.pyomo_solver_status = pyomo_results.solver.status
     job_result.termination_condition = pyomo_results.solver.termination_condition
@@ -66,13 +70,14 @@ def BARON(pyomo_model):
     global_for_model_types={ModelType.MINLP, ModelType.cvxMINLP, ModelType.MILP})
 def SCIP(pyomo_model):
     job_result = _JobResult()
-    pyomo_results = SolverFactory('gams').solve(
-        pyomo_model,
-        tee=True,
-        # keepfiles=True,
-        solver='scip',
-        add_options=get_base_gams_options_list() + [f'option reslim={options.time_limit};']
-    )
+    with reuse_gams_model_file(pyomo_model, job_result), record_gams_statistics(job_result) as gams_output_files:
+        pyomo_results = SolverFactory('gams').solve(
+            pyomo_model,
+            tee=True,
+            **gams_output_files,
+            solver='scip',
+            add_options=get_base_gams_options_list() + [f'option reslim={options.time_limit};']
+        )
     job_result.solver_run_time = pyomo_results.solver.user_time
     job_result.pyomo_solver_status = pyomo_results.solver.status
     job_result.termination_condition = pyomo_results.solver.termination_condition
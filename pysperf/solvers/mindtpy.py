@@ -4,6 +4,7 @@ from pysperf.base_classes import _JobResult
 from pysperf.config import get_base_gams_options_list, options
 from pysperf.model_types import ModelType
 from pysperf.solver_library_tools import register_GDP_reformulations, register_solve_function
+from pysperf.subsolver_timing import time_subsolvers
 
 
 @register_GDP_reformulations
@@ -15,18 +16,19 @@ from pysperf.solver_library_tools import register_GDP_reformulations, register_s
 )
 def OA(pyomo_model):
     job_result = _JobResult()
-    pyomo_results = SolverFactory('mindtpy').solve(
-        pyomo_model,
-        strategy='OA',
-        tee=True,
-        mip_solver='gams',
-        mip_solver_args=dict(solver='cplex', add_options=get_base_gams_options_list()),
-        nlp_solver='ipopt',
-        # nlp_solver_args=dict(solver='ipopth', add_options=get_base_gams_options_list()),
-        iteration_limit=300,
-        time_limit=options.time_limit
-    )
-    job_result.solver_run_time = pyomo_results.solver.timing.total
+    with time_subsolvers(job_result, ("gams", "ipopt")):
+        pyomo_results = SolverFactory('mindtpy').solve(
+            pyomo_model,
+            strategy='OA',
+            tee=True,
+            mip_solver='gams',
+            mip_solver_args=dict(solver='cplex', add_options=get_base_gams_options_list()),
+            nlp_solver='ipopt',
+            # nlp_solver_args=dict(solver='ipopth', add_options=get_base_gams_options_list()),
+            iteration_limit=300,
+            time_limit=options.time_limit
+        )
+    job_result.solver_run_time = pyomo_results.solver.timing.total - job_result.subsolver_classification_time
     job_result.pyomo_solver_status = pyomo_results.solver.status
     job_result.iterations = pyomo_results.solver.iterations
     job_result.termination_condition = pyomo_results.solver.termination_condition
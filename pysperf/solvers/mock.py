@@ -0,0 +1,139 @@
+"""
+Mock solvers, for exercising the run managers, analysis and exporters without solver licenses or solver time.
+
+Registered only if the PYSPERF_MOCK_SOLVERS environment variable is set, which the job scripts inherit.
+Each mock solver draws the solver time of a job from a lognormal distribution, and reports bounds around the
+optimal (or best known) value of the model. Jobs that reach the time limit report a gap, and a fraction of the
+jobs fail as real solvers do: wrong solutions, solver errors, and crashes of the job process.
+The draws are seeded by the solver, model and attempt, so that a rerun of a job gives the same result.
+
+The drawn solver time is reported, but the job only spends PYSPERF_MOCK_TIME_SCALE wall seconds per reported
+second (default 0.01), sleeping, or burning CPU if PYSPERF_MOCK_BURN_CPU is set.
+"""
+import os
+import random
+from collections import defaultdict
+from math import log
+from time import monotonic, sleep
+from typing import Optional
+
+from pyomo.environ import maximize, Objective
+from pyutilib.misc import Container
+
+from pysperf.base_classes import _JobResult, InfeasibleExpected
+from pysperf.config import current_job, models, options, solvers
+from pysperf.model_types import ModelType
+from pysperf.solver_library_tools import register_solver
+
+# Profiles of the mock solvers: median solver time (s) and lognormal shape of the solver time distribution,
+# rates of the failure modes, and whether the solver reports global optimality.
+mock_solver_profiles = {
+    "Mock-Fast": dict(median_time=2, sigma=1.0, wrong_rate=0.0, error_rate=0.01, crash_rate=0.0, is_global=True),
+    "Mock-Slow": dict(median_time=60, sigma=1.5, wrong_rate=0.0, error_rate=0.01, crash_rate=0.0, is_global=True),
+    "Mock-Local": dict(median_time=5, sigma=1.0, wrong_rate=0.2, error_rate=0.02, crash_rate=0.0, is_global=False),
+    "Mock-Flaky": dict(median_time=10, sigma=2.0, wrong_rate=0.05, error_rate=0.1, crash_rate=0.05, is_global=True),
+}
+# Number of solves of each job by this process, to seed the repeated attempts of a job differently
+_attempt_counts = defaultdict(int)
+
+
+def draw_mock_outcome(solver_name: str, model_name: str, attempt: int = 0,
+                      objective_sense: Optional[str] = None) -> Container:
+    """
+    Draws the outcome of a mock solver job: the failure mode ('error', 'crash' or None), the termination condition,
+    the reported solver time, bounds, and iteration and node counts.
+    The objective sense defaults to the one in the model statistics.
+    """
+    profile = mock_solver_profiles[solver_name]
+    rng = random.Random(f"{solver_name}/{model_name}/{attempt}")
+    test_model = models[model_name]
+    outcome = Container(failure=None, LB=None, UB=None)
+    outcome.solver_time = rng.lognormvariate(log(profile["median_time"]), profile["sigma"])
+    failure_draw = rng.random()
+    if failure_draw < profile["crash_rate"]:
+        outcome.failure = 'crash'
+    elif failure_draw < profile["crash_rate"] + profile["error_rate"]:
+        outcome.failure = 'error'
+    if outcome.solver_time >= options.time_limit:
+        outcome.solver_time = options.time_limit
+        outcome.termination_condition = 'maxTimeLimit'
+    elif test_model.opt_value is InfeasibleExpected:
+        outcome.termination_condition = 'infeasible'
+    else:
+        outcome.termination_condition = 'optimal' if profile["is_global"] else 'locallyOptimal'
+    outcome.nodes = int(outcome.solver_time * rng.uniform(50, 200))
+    outcome.iterations = outcome.nodes * rng.randint(5, 20)
+    if outcome.termination_condition == 'infeasible':
+        return outcome
+
+    reference_value = next((value for value in (test_model.opt_value, test_model.best_value)
+                            if value is not None and value is not InfeasibleExpected), 0.0)
+    value_scale = max(abs(reference_value), 1.0)
+    if outcome.termination_condition == 'maxTimeLimit':
+        primal_gap, dual_gap = rng.uniform(0, 0.2), rng.uniform(0.01, 0.2)
+    elif rng.random() < profile["wrong_rate"]:
+        primal_gap, dual_gap = rng.uniform(0.02, 0.5), 0.0
+    else:
+        primal_gap, dual_gap = rng.uniform(0, options.optcr / 2), rng.uniform(0, options.optcr / 2)
+    if not profile["is_global"]:
+        dual_gap = float('inf')
+    primal_value = reference_value + primal_gap * value_scale
+    dual_value = reference_value - dual_gap * value_scale
+    if (objective_sense or test_model.objective_sense) == 'maximize':
+        primal_value, dual_value = 2 * reference_value - primal_value, 2 * reference_value - dual_value
+        outcome.LB, outcome.UB = primal_value, dual_value
+    else:
+        outcome.LB, outcome.UB = dual_value, primal_value
+    # Unbounded dual values are not reported
+    outcome.LB = outcome.LB if abs(outcome.LB) != float('inf') else None
+    outcome.UB = outcome.UB if abs(outcome.UB) != float('inf') else None
+    return outcome
+
+
+def _spend_wall_time(seconds: float) -> None:
+    if not os.environ.get("PYSPERF_MOCK_BURN_CPU"):
+        sleep(seconds)
+        return
+    end_time = monotonic() + seconds
+    while monotonic() < end_time:
+        sum(i * i for i in range(1000))
+
+
+def _mock_solve(solver_name: str, pyomo_model) -> _JobResult:
+    model_name = current_job.model_name
+    attempt = _attempt_counts[solver_name, model_name]
+    _attempt_counts[solver_name, model_name] += 1
+    active_objective = next(pyomo_model.component_data_objects(Objective, active=True))
+    outcome = draw_mock_outcome(solver_name, model_name, attempt,
+                                objective_sense='maximize' if active_objective.sense == maximize else 'minimize')
+    time_scale = float(os.environ.get("PYSPERF_MOCK_TIME_SCALE", 0.01))
+    _spend_wall_time(outcome.solver_time * time_scale)
+    if outcome.failure == 'crash':
+        os._exit(139)  # As a segmentation fault of the solver would end the job
+    elif outcome.failure == 'error':
+        raise RuntimeError(f"{solver_name} failed on {model_name} (mock solver error).")
+    job_result = _JobResult()
+    job_result.solver_run_time = outcome.solver_time
+    job_result.pyomo_solver_status = 'ok'
+    job_result.termination_condition = outcome.termination_condition
+    job_result.LB = outcome.LB
+    job_result.UB = outcome.UB
+    job_result.iterations = outcome.iterations
+    job_result.nodes = outcome.nodes
+    return job_result
+
+
+def register_mock_solvers() -> None:
+    """Registers the mock solvers that are not registered yet."""
+    for solver_name, profile in mock_solver_profiles.items():
+        if solver_name in solvers:
+            continue
+        register_solver(
+            solver_name,
+            lambda pyomo_model, solver_name=solver_name: _mock_solve(solver_name, pyomo_model),
+            compatible_model_types=set(ModelType),
+            global_for_model_types=set(ModelType) if profile["is_global"] else set())
+
+
+if os.environ.get("PYSPERF_MOCK_SOLVERS"):
+    register_mock_solvers()
@@ -0,0 +1,130 @@
+"""
+Adaptive runs by statistical racing, in the spirit of F-race.
+
+The jobs of each model type are executed in rounds over a sample of its models. After each round, the times to
+solution of the remaining solvers on the models executed so far are compared with the Friedman test. If the solvers
+differ significantly, the solvers that are significantly worse than the best solver in a Bonferroni-Dunn post-hoc
+test are dropped, and their remaining jobs are recorded as pruned rather than executed.
+"""
+import random
+from collections import defaultdict
+from math import sqrt
+from pathlib import Path
+from statistics import NormalDist
+from typing import List, Set, Tuple
+
+import numpy
+import pandas
+
+from .analysis import (
+    _calculate_gaps, _calculate_times_to_solution, _ingest_run_results, _join_library_info, _result_record_columns, )
+from .config import job_result_filename, options
+from .model_library import models, requires_model_stats
+from .run_manager import _load_run_config, _write_run_config, get_run_dir, this_run_config
+from .serial_run_manager import execute_jobs
+
+# Seed of the shuffled order in which the models of each model type are raced.
+_model_sample_seed = 0
+
+
+def friedman_test(ranks: numpy.ndarray) -> Tuple[float, float]:
+    """
+    Friedman test of the hypothesis that all solvers perform alike, from a model by solver matrix of ranks.
+
+    Returns the statistic, with the tie correction of Conover, and its p-value from the Wilson-Hilferty
+    normal approximation of the chi-squared distribution with (solvers - 1) degrees of freedom.
+    """
+    num_models, num_solvers = ranks.shape
+    rank_sums = ranks.sum(axis=0)
+    tie_term = num_models * num_solvers * (num_solvers + 1) ** 2 / 4
+    denominator = (ranks ** 2).sum() - tie_term
+    if num_solvers < 2 or denominator <= 0:  # All solvers tie on every model
+        return 0.0, 1.0
+    statistic = (num_solvers - 1) * ((rank_sums - num_models * (num_solvers + 1) / 2) ** 2).sum() / denominator
+    degrees_of_freedom = num_solvers - 1
+    variance = 2 / (9 * degrees_of_freedom)
+    z_score = ((statistic / degrees_of_freedom) ** (1 / 3) - (1 - variance)) / sqrt(variance)
+    return float(statistic), 1 - NormalDist().cdf(z_score)
+
+
+def get_dominated_solvers(time_matrix: pandas.DataFrame, significance_level: float) -> List[str]:
+    """
+    Returns the solvers that are significantly worse than the best solver on a model by solver time matrix.
+
+    Solvers are ranked on each model, with infinite times for the models that they did not solve.
+    If the Friedman test rejects that all solvers perform alike, the mean rank of each solver is compared to the
+    best mean rank with the Bonferroni-Dunn test.
+    """
+    num_models, num_solvers = time_matrix.shape
+    if num_solvers < 2 or num_models < 2:
+        return []
+    ranks = time_matrix.rank(axis=1, method="average")
+    _, p_value = friedman_test(ranks.to_numpy())
+    if p_value >= significance_level:
+        return []
+    mean_ranks = ranks.mean(axis=0)
+    critical_value = NormalDist().inv_cdf(1 - significance_level / (num_solvers - 1))
+    critical_difference = critical_value * sqrt(num_solvers * (num_solvers + 1) / (6 * num_models))
+    return sorted(mean_ranks[mean_ranks - mean_ranks.min() > critical_difference].index)
+
+
+def _get_race_time_matrix(this_run_dir: Path, jobs_executed: List[Tuple[str, str]],
+                          model_names: List[str], solver_names: Set[str]) -> pandas.DataFrame:
+    """Returns the times to solution of the solvers on the models, with infinite times for failed jobs."""
+    jobs_with_results = [
+        (model_name, solver_name) for model_name, solver_name in jobs_executed
+        if this_run_dir.joinpath(solver_name, model_name, job_result_filename).exists()]
+    records = [record for record in _ingest_run_results(this_run_dir, jobs_with_results) if record is not None]
+    table = pandas.DataFrame.from_records(records, columns=_result_record_columns)
+    table["time_limit"] = table["time_limit"].fillna(this_run_config.time_limit)
+    table = _join_library_info(table)
+    _calculate_gaps(table)
+    _calculate_times_to_solution(table)
+    time_matrix = table.pivot_table(index="model", columns="solver", values="time_to_soln", aggfunc="min")
+    return time_matrix.reindex(index=model_names, columns=sorted(solver_names)).fillna(numpy.inf)
+
+
+@requires_model_stats
+def execute_adaptive_run():
+    this_run_dir = get_run_dir()
+    _load_run_config(this_run_dir)
+    round_size = options["racing round size"]
+    minimum_models = options["racing minimum models"]
+    significance_level = options["racing significance level"]
+    jobs_to_run = set(this_run_config.jobs_to_run)
+    jobs_pruned = set(this_run_config.get('jobs_pruned', ()))
+    jobs_executed = []
+
+    model_type_jobs = defaultdict(list)
+    for model_name, solver_name in this_run_config.jobs_to_run:
+        model_type_jobs[models[model_name].model_type].append((model_name, solver_name))
+    for model_type, type_jobs in model_type_jobs.items():
+        model_sample = sorted({model_name for model_name, _ in type_jobs})
+        random.Random(_model_sample_seed).shuffle(model_sample)
+        remaining_solvers = {solver_name for _, solver_name in type_jobs}
+        print(f"Racing {len(remaining_solvers)} solvers on {len(model_sample)} {model_type.name} models.")
+        for round_start in range(0, len(model_sample), round_size):
+            round_models = model_sample[round_start:round_start + round_size]
+            round_jobs = [(model_name, solver_name) for model_name in round_models for solver_name in sorted(
+                remaining_solvers) if (model_name, solver_name) in jobs_to_run]
+            execute_jobs(this_run_dir, round_jobs)
+            jobs_executed.extend(round_jobs)
+            jobs_to_run.difference_update(round_jobs)
+
+            raced_models = model_sample[:round_start + len(round_models)]
+            if len(raced_models) < minimum_models or len(remaining_solvers) < 2:
+                continue
+            time_matrix = _get_race_time_matrix(this_run_dir, jobs_executed, raced_models, remaining_solvers)
+            dominated_solvers = get_dominated_solvers(time_matrix, significance_level)
+            if not dominated_solvers:
+                continue
+            print(f"Dropping solvers dominated on {len(raced_models)} {model_type.name} models: "
+                  f"{', '.join(dominated_solvers)}")
+            remaining_solvers.difference_update(dominated_solvers)
+            newly_pruned = {job for job in type_jobs if job in jobs_to_run and job[1] in dominated_solvers}
+            jobs_to_run.difference_update(newly_pruned)
+            jobs_pruned.update(newly_pruned)
+            this_run_config.jobs_to_run = [job for job in this_run_config.jobs_to_run if job not in jobs_pruned]
+            this_run_config.jobs_pruned = jobs_pruned
+            _write_run_config(this_run_dir)
+    print(f"{len(jobs_executed)} jobs executed and {len(jobs_pruned)} jobs pruned by racing.")
@@ -0,0 +1,118 @@
+"""
+Timing of the subsolver calls of decomposition algorithms (e.g. GDPopt and MindtPy).
+
+While the algorithm runs, the Pyomo solvers that it uses for its subproblems are created through a proxy that times
+each solve and classifies the subproblem (LP, MIP, NLP or MINLP). The subsolver names stay the same, so that
+algorithm code special-casing a subsolver (e.g. setting GAMS options) is unaffected. The job result records:
+- the category, wall time and solver-reported time of each subsolver call, in call order,
+- the number of calls and wall time per category,
+- the subsolver interface time: the wall time of the calls in excess of the solver-reported time
+  (writing model files, launching processes, and reading results back),
+- the decomposition overhead: the time of the algorithm outside of the subsolver calls
+  (e.g. Pyomo model cloning and cut generation),
+- the classification time: the time that the timing itself spends classifying the subproblems.
+  It is excluded from the decomposition overhead, and the solve functions subtract it from the solver time.
+"""
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import partial
+from time import monotonic
+from typing import Iterable, List
+
+from pyomo.environ import Constraint, Objective, SolverFactory, Var
+
+from .base_classes import _JobResult
+from .solver_library_tools import get_reported_solver_time
+
+subproblem_categories = ["lp", "mip", "nlp", "minlp"]
+
+
+def _classify_subproblem(pyomo_model) -> str:
+    discrete = any((var.is_binary() or var.is_integer()) and not var.fixed
+                   for var in pyomo_model.component_data_objects(Var, active=True))
+    expressions = [constraint.body for constraint in pyomo_model.component_data_objects(Constraint, active=True)]
+    expressions += [objective.expr for objective in pyomo_model.component_data_objects(Objective, active=True)]
+    nonlinear = any(expression.polynomial_degree() not in (0, 1) for expression in expressions)
+    return ("minlp" if nonlinear else "mip") if discrete else ("nlp" if nonlinear else "lp")
+
+
+class _TimedSolver(object):
+    """Proxy of a Pyomo solver object, which records the category and times of each solve."""
+
+    def __init__(self, pyomo_solver, subsolver_calls: List[list]):
+        self._pyomo_solver = pyomo_solver
+        self._subsolver_calls = subsolver_calls
+
+    def __getattr__(self, name):
+        return getattr(self._pyomo_solver, name)
+
+    def __enter__(self):
+        self._pyomo_solver.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return self._pyomo_solver.__exit__(exc_type, exc_val, exc_tb)
+
+    def solve(self, pyomo_model, *args, **kwargs):
+        classification_start_time = monotonic()
+        category = _classify_subproblem(pyomo_model)
+        classification_time = monotonic() - classification_start_time
+        pyomo_results = None
+        start_time = monotonic()
+        try:
+            pyomo_results = self._pyomo_solver.solve(pyomo_model, *args, **kwargs)
+            return pyomo_results
+        finally:
+            wall_time = monotonic() - start_time
+            reported_time = get_reported_solver_time(pyomo_results) if pyomo_results is not None else None
+            self._subsolver_calls.append([category, wall_time, reported_time, classification_time])
+
+
+def _create_timed_solver(solver_class, subsolver_calls: List[list], **kwargs):
+    pyomo_solver = solver_class(**kwargs)
+    return _TimedSolver(pyomo_solver, subsolver_calls) if pyomo_solver is not None else None
+
+
+@contextmanager
+def time_subsolvers(job_result: _JobResult, subsolver_names: Iterable[str] = ("gams",)):
+    """
+    Context manager that times the calls to the named Pyomo subsolvers, and records the time decomposition
+    of the enclosed algorithm run in the job result.
+
+    The subsolvers are registered under their names as timed solvers for the duration of the run, and the original
+    solvers are registered back on exit.
+    """
+    subsolver_calls = []
+    original_solvers = {name: (SolverFactory.get_class(name), SolverFactory.doc(name)) for name in subsolver_names}
+    for name, (solver_class, solver_doc) in original_solvers.items():
+        SolverFactory.unregister(name)
+        SolverFactory.register(name, solver_doc)(partial(_create_timed_solver, solver_class, subsolver_calls))
+    start_time = monotonic()
+    try:
+        yield
+    finally:
+        total_time = monotonic() - start_time
+        for name, (solver_class, solver_doc) in original_solvers.items():
+            SolverFactory.unregister(name)
+            SolverFactory.register(name, solver_doc)(solver_class)
+        _record_subsolver_calls(job_result, subsolver_calls, total_time)
+
+
+def _record_subsolver_calls(job_result: _JobResult, subsolver_calls: List[list], total_time: float) -> None:
+    category_counts = defaultdict(int)
+    category_times = defaultdict(float)
+    for category, wall_time, _, _ in subsolver_calls:
+        category_counts[category] += 1
+        category_times[category] += wall_time
+    # Each call: [category, wall time, solver-reported time, classification time]
+    job_result.subsolver_calls = subsolver_calls
+    job_result.subsolver_solves = len(subsolver_calls)
+    for category in subproblem_categories:
+        job_result[f"subsolver_{category}_count"] = category_counts[category]
+        job_result[f"subsolver_{category}_time"] = category_times[category]
+    job_result.subsolver_interface_time = sum(
+        wall_time - reported_time for _, wall_time, reported_time, _ in subsolver_calls if reported_time is not None)
+    job_result.subsolver_classification_time = sum(
+        classification_time for _, _, _, classification_time in subsolver_calls)
+    job_result.decomposition_overhead_time = (
+        total_time - sum(category_times.values()) - job_result.subsolver_classification_time)
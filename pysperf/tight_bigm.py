@@ -0,0 +1,118 @@
+"""
+Tight Big-M values for the Big-M reformulation of GDP models.
+
+Library models declare a single Big-M value for all of their disjunct constraints (the BigM suffix entry for None),
+which is often loose. With the 'tight BigM' option, the Big-M reformulation instead uses Big-M values computed for
+each disjunct constraint: the variable bounds are tightened by feasibility-based bounds tightening (FBBT) over
+the global constraints, and the bounds of each disjunct constraint body follow by interval arithmetic.
+A computed value is only used where it is tighter than the value declared by the model.
+
+The computed values are cached per model fingerprint (a hash of the variables, their bounds, and the constraints),
+so that they are computed once per model for all jobs and runs.
+"""
+import hashlib
+import json
+import logging
+import os
+from time import monotonic
+from typing import Dict, Optional, Tuple
+
+from pyomo.contrib.fbbt.fbbt import compute_bounds_on_expr, fbbt
+from pyomo.environ import Block, ConcreteModel, Constraint, Suffix, Var
+from pyomo.gdp import Disjunct
+
+from .config import _tight_bigm_cache_dir
+
+# Sources of the Big-M values of a Big-M reformulation, as recorded in the job result
+bigm_sources = ["tight", "model", "estimated"]
+
+
+def get_model_fingerprint(pyomo_model: ConcreteModel) -> str:
+    """Returns a hash of the active variables (with their domains and bounds) and constraints of the model."""
+    fingerprint = hashlib.sha256()
+    for var in pyomo_model.component_data_objects(Var, descend_into=(Block, Disjunct), sort=True):
+        fingerprint.update(f"{var.name} {var.domain} {var.lb} {var.ub} {var.fixed}\n".encode())
+    for constraint in pyomo_model.component_data_objects(
+            Constraint, active=True, descend_into=(Block, Disjunct), sort=True):
+        fingerprint.update(f"{constraint.name} {constraint.expr}\n".encode())
+    return fingerprint.hexdigest()[:16]
+
+
+def compute_tight_bigm(pyomo_model: ConcreteModel) -> Dict[str, Tuple[Optional[float], Optional[float]]]:
+    """
+    Returns the Big-M values of the disjunct constraints of the model, by constraint name, as (lower, upper) pairs
+    in the format of the BigM suffix. Constraints with an unbounded body are omitted.
+    """
+    bounds_model = pyomo_model.clone()
+    # Only the global constraints hold whether or not a disjunct is active. FBBT does not descend into disjuncts.
+    fbbt(bounds_model)
+    tight_bigm = {}
+    for disjunct in bounds_model.component_data_objects(Disjunct, active=True, descend_into=(Block, Disjunct)):
+        for constraint in disjunct.component_data_objects(Constraint, active=True, descend_into=Block):
+            body_lb, body_ub = compute_bounds_on_expr(constraint.body)
+            lower_M = upper_M = None
+            if constraint.lower is not None:
+                if body_lb is None:
+                    continue
+                lower_M = body_lb - constraint.lower
+            if constraint.upper is not None:
+                if body_ub is None:
+                    continue
+                upper_M = body_ub - constraint.upper
+            tight_bigm[constraint.name] = (lower_M, upper_M)
+    return tight_bigm
+
+
+def _load_tight_bigm(cache_path) -> Optional[dict]:
+    try:
+        with cache_path.open('r') as cache_file:
+            return {name: tuple(M) for name, M in json.load(cache_file).items()}
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _cache_tight_bigm(cache_path, tight_bigm: dict) -> None:
+    cache_path.parent.mkdir(exist_ok=True, parents=True)
+    # Write to a temporary file first, so that concurrent jobs never read a partial file.
+    tmp_cache_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    with tmp_cache_path.open('w') as cache_file:
+        json.dump(tight_bigm, cache_file)
+    tmp_cache_path.replace(cache_path)
+
+
+def apply_tight_bigm(pyomo_model: ConcreteModel, model_name: str) -> dict:
+    """
+    Adds the tight Big-M values of the disjunct constraints of the model to its BigM suffix, computing them
+    if they are not cached.
+
+    Returns information for the job result: the number of constraints with tightened Big-M values,
+    and whether the values were cached, with the time to compute or load them.
+    """
+    start_time = monotonic()
+    cache_path = _tight_bigm_cache_dir.joinpath(f"{model_name}.{get_model_fingerprint(pyomo_model)}.json")
+    tight_bigm = _load_tight_bigm(cache_path)
+    bigm_info = {'tight_bigm_cached': tight_bigm is not None}
+    if tight_bigm is None:
+        try:
+            tight_bigm = compute_tight_bigm(pyomo_model)
+        except Exception as err:  # e.g. FBBT detecting infeasibility
+            logging.warning(f"Unable to compute tight Big-M values for {model_name}: {err}")
+            tight_bigm = {}
+        _cache_tight_bigm(cache_path, tight_bigm)
+    bm_suffix = pyomo_model.component("BigM")
+    if bm_suffix is None:
+        bm_suffix = pyomo_model.BigM = Suffix()
+    model_M = bm_suffix.get(None, None)
+    num_tightened = 0
+    for constraint_name, (lower_M, upper_M) in tight_bigm.items():
+        if model_M is not None and all(M is None or abs(M) >= model_M for M in (lower_M, upper_M)):
+            continue  # The declared value is at least as tight
+        constraint = pyomo_model.find_component(constraint_name)
+        if model_M is not None:
+            lower_M = max(lower_M, -model_M) if lower_M is not None else None
+            upper_M = min(upper_M, model_M) if upper_M is not None else None
+        bm_suffix[constraint] = (lower_M, upper_M)
+        num_tightened += 1
+    bigm_info['tight_bigm_constraints'] = num_tightened
+    bigm_info['tight_bigm_time'] = monotonic() - start_time
+    return bigm_info
@@ -4,7 +4,8 @@ import yaml
 
 from pysperf import options
 from pysperf.model_library import models, requires_model_stats
-from .run_manager import _load_run_config, get_run_dir, get_time_limit_with_buffer, this_run_config
+from .run_manager import (
+    _load_run_config, get_job_processes, get_run_dir, get_time_limit_with_buffer, this_run_config, )
 
 
 @requires_model_stats
@@ -20,7 +21,7 @@ def execute_run():
         runner_script = this_run_dir.joinpath(solver_name, model_name, "run_job.sh")
         time_limit = options.time_limit
         qsub_time_limit = _qsub_time_limit_with_buffer(models[model_name].build_time)
-        processes = options.processes
+        processes = get_job_processes(solver_name)
         memory = options.memory
         qsub_N_arg = f'r{int(current_run_num)}-{jobnum}:{len(jobs)}-t{int(time_limit)}s'
         qsub_N_arg = qsub_N_arg[:15]  # TODO qsub -N flag only accepts up to 15 characters. Truncate for now.
@@ -0,0 +1,173 @@
+"""
+Budgeted tuning of solver parameters.
+
+A tuning run is a normal run over the variants of the parameter grids of the tuned solvers
+(see register_solver_variants). Its jobs are executed serially under a CPU time budget, split evenly over the
+model types, by random search or successive halving. Jobs left unexecuted by the budget or by the search are
+recorded as pruned. The best variants for each model type are reported.
+"""
+import random
+from collections import defaultdict
+from math import ceil, log2
+from pathlib import Path
+from time import monotonic
+from typing import List, Set, Tuple
+
+import numpy
+import pandas
+
+from .config import options, outputdir
+from .model_library import models, requires_model_stats
+from .run_manager import _write_run_config, get_run_dir, setup_new_matrix_run, this_run_config
+from .serial_run_manager import execute_jobs
+from .solver_library_tools import register_solver_variants
+from .statistical_racing import _get_race_time_matrix
+
+tuning_methods = ["random", "halving"]
+# Seed of the random order of the models and variants.
+_tuning_seed = 0
+
+
+class _TuningBudget(object):
+    """CPU time budget (seconds) of a tuning run. Jobs are charged their wall time times the processor limit."""
+
+    def __init__(self, cpu_time: float):
+        self.cpu_time = cpu_time
+        self.spent = 0.0
+
+    @property
+    def remaining(self) -> float:
+        return max(self.cpu_time - self.spent, 0.0)
+
+    def execute_jobs(self, this_run_dir: Path, jobs: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        """Executes jobs within the remaining budget, and returns the executed jobs."""
+        if not jobs:
+            return []
+        start_time = monotonic()
+        jobs_executed = execute_jobs(this_run_dir, jobs, time_budget=self.remaining / options.processes)
+        self.spent += (monotonic() - start_time) * options.processes
+        return jobs_executed
+
+
+def _random_search(this_run_dir: Path, model_sample: List[str], variants: List[str], budget: _TuningBudget,
+                   share: float) -> List[Tuple[str, str]]:
+    """Evaluates the variants, in random order, on all models until the budget share is spent."""
+    type_budget = _TuningBudget(budget.remaining * share)
+    jobs_executed = []
+    for variant in variants:
+        if not type_budget.remaining:
+            break
+        jobs_executed.extend(type_budget.execute_jobs(
+            this_run_dir, [(model_name, variant) for model_name in model_sample]))
+    budget.spent += type_budget.spent
+    return jobs_executed
+
+
+def _successive_halving(this_run_dir: Path, model_sample: List[str], variants: List[str], budget: _TuningBudget,
+                        share: float) -> List[Tuple[str, str]]:
+    """
+    Evaluates the variants on a doubling number of models, keeping the better half of the variants
+    (by mean rank of their times to solution) after each rung, until the budget share is spent.
+    The last rung evaluates the remaining variant on all models.
+    """
+    type_budget = _TuningBudget(budget.remaining * share)
+    num_rungs = ceil(log2(len(variants))) + 1
+    remaining_variants = list(variants)
+    jobs_executed = []
+    for rung in range(num_rungs):
+        rung_models = model_sample[:max(1, ceil(len(model_sample) / 2 ** (num_rungs - 1 - rung)))]
+        previous_jobs = set(jobs_executed)
+        rung_jobs = [(model_name, variant) for model_name in rung_models for variant in remaining_variants
+                     if (model_name, variant) not in previous_jobs]
+        jobs_executed.extend(type_budget.execute_jobs(this_run_dir, rung_jobs))
+        if not type_budget.remaining or len(remaining_variants) == 1:
+            continue
+        time_matrix = _get_race_time_matrix(this_run_dir, jobs_executed, rung_models, set(remaining_variants))
+        mean_ranks = time_matrix.rank(axis=1, method="average").mean(axis=0).sort_values(kind="mergesort")
+        remaining_variants = list(mean_ranks.index[:ceil(len(remaining_variants) / 2)])
+        print(f"Successive halving kept {len(remaining_variants)} variants after {len(rung_models)} models: "
+              f"{', '.join(remaining_variants)}")
+    budget.spent += type_budget.spent
+    return jobs_executed
+
+
+def _summarize_variants(this_run_dir: Path, jobs_executed: List[Tuple[str, str]],
+                        model_names: List[str], variants: Set[str]) -> pandas.DataFrame:
+    """
+    Summarizes the variants evaluated on the models, from best to worst: by number of models evaluated,
+    number of models solved, and shifted geometric mean time to solution (the time limit if unsolved).
+    """
+    time_matrix = _get_race_time_matrix(this_run_dir, jobs_executed, model_names, variants)
+    executed = pandas.DataFrame(False, index=time_matrix.index, columns=time_matrix.columns)
+    for model_name, variant in jobs_executed:
+        if model_name in executed.index and variant in executed.columns:
+            executed.loc[model_name, variant] = True
+    times = time_matrix.where(executed).clip(upper=this_run_config.time_limit)
+    shift = options["shifted geometric mean shift"]
+    summary = pandas.DataFrame({
+        "models": executed.sum(axis=0),
+        "solved": (time_matrix.where(executed) < numpy.inf).sum(axis=0),
+        "sgm_time_to_soln": numpy.exp(numpy.log(times + shift).mean(axis=0)) - shift,
+    })
+    summary = summary[summary["models"] > 0].sort_values(
+        ["models", "solved", "sgm_time_to_soln"], ascending=[False, False, True], kind="mergesort")
+    return summary.rename_axis("solver").reset_index()
+
+
+@requires_model_stats
+def execute_tuning_run(solver_names: List[str], model_set: Set[str] = (), model_type_set: Set[str] = (),
+                       method: str = "halving", cpu_hours: float = 1.0) -> pandas.DataFrame:
+    """
+    Sets up a run of the variants of the solvers, and executes it within the CPU hour budget.
+
+    Returns the summary of the variants evaluated for each model type, best first, which is also written
+    to the output directory.
+    """
+    if method not in tuning_methods:
+        raise ValueError(f"Unknown tuning method {method}. Expected one of {tuning_methods}.")
+    variant_names = [variant for solver_name in solver_names for variant in register_solver_variants(solver_name)]
+    setup_new_matrix_run(model_set=model_set, solver_set=set(variant_names), model_type_set=model_type_set)
+    this_run_dir = get_run_dir()
+    run_number = options["current run number"]
+    budget = _TuningBudget(cpu_hours * 3600)
+    search = _successive_halving if method == "halving" else _random_search
+    rng = random.Random(_tuning_seed)
+
+    model_type_jobs = defaultdict(list)
+    for model_name, solver_name in this_run_config.jobs:
+        model_type_jobs[models[model_name].model_type].append((model_name, solver_name))
+    jobs_executed = []
+    summaries = []
+    for type_num, (model_type, type_jobs) in enumerate(model_type_jobs.items()):
+        model_sample = sorted({model_name for model_name, _ in type_jobs})
+        variants = sorted({solver_name for _, solver_name in type_jobs})
+        rng.shuffle(model_sample)
+        rng.shuffle(variants)
+        print(f"Tuning {len(variants)} variants on {len(model_sample)} {model_type.name} models "
+              f"with {budget.remaining / 3600:.2f} CPU hours remaining.")
+        # Split the remaining budget evenly over the remaining model types
+        type_jobs_executed = search(
+            this_run_dir, model_sample, variants, budget, share=1 / (len(model_type_jobs) - type_num))
+        jobs_executed.extend(type_jobs_executed)
+        summary = _summarize_variants(this_run_dir, type_jobs_executed, model_sample, set(variants))
+        summary.insert(0, "model_type", model_type.name)
+        summaries.append(summary)
+
+    this_run_config.jobs_to_run = jobs_executed
+    this_run_config.jobs_pruned = set(this_run_config.jobs) - set(jobs_executed)
+    _write_run_config(this_run_dir)
+    summary = pandas.concat(summaries, ignore_index=True) if summaries else pandas.DataFrame(
+        columns=["model_type", "solver", "models", "solved", "sgm_time_to_soln"])
+    summary_path = outputdir.joinpath(f"tune.run{run_number}.csv")
+    summary.to_csv(summary_path, index=False)
+    print(f"Tuning run{run_number} used {budget.spent / 3600:.2f} of {cpu_hours:.2f} CPU hours "
+          f"for {len(jobs_executed)} jobs.")
+    if summary.empty:
+        print("No completed variants.")
+        return summary
+    print("Best variants:")
+    for best in summary.drop_duplicates("model_type").itertuples():
+        print(f" - {best.model_type}: {best.solver} ({best.solved} of {best.models} solved, "
+              f"shifted geometric mean time {best.sgm_time_to_soln:.2f})")
+    print(f"Variant summary written to '{summary_path}'.")
+    return summary
@@ -14,6 +14,7 @@ def warn(s):
 kwargs = dict(
     name='pysperf',
     packages=find_packages(),
+    python_requires='>=3.8',
     install_requires=[],
     extras_require={},
     package_data={
@@ -31,7 +32,8 @@ kwargs = dict(
     data_files=[],
     keywords=["pyomo", "generalized disjunctive programming"],
     classifiers=[
-        "Programming Language :: Python :: 3.6",
+        "Programming Language :: Python :: 3",
+        "Programming Language :: Python :: 3.8",
         "Development Status :: 4 - Beta",
         "Intended Audience :: Developers",
         "License :: OSI Approved :: BSD License",